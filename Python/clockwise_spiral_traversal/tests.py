@@ -17,5 +17,8 @@ class SpiralTraverseAndVowelsTest(unittest.TestCase):
     def test5(self):
         self.assertEqual(spiral_traverse_and_vowels([['a']]), [1])
 
+    def test6(self):
+        self.assertEqual(spiral_traverse_and_vowels(["abcd", "efgh", "ijkl"]), [1, 9, 10])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
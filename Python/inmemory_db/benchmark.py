@@ -0,0 +1,174 @@
+"""
+YCSB-style benchmark for the in-memory database levels.
+
+A workload is generated up front from a seed, so every level replays the exact
+same commands:
+- a load phase fills `records` records with `fields` fields each
+- the run phase mixes reads (GET), writes (SET) and scans (SCAN_BY_PREFIX) by the
+  given ratios, picking records with Zipfian skew (theta 0 is uniform)
+- with timestamps (L3 and up), a `ttl_ratio` share of writes carry a TTL drawn
+  from `ttl_range`, and (L4 and up) every `backup_every` operations a BACKUP is
+  taken and every `restore_every` operations a RESTORE to a random earlier backup
+
+For each level the run phase reports ops/sec, p50/p99/p999 latency per command
+and peak RSS, as JSON. Every level runs in a fresh interpreter so peak RSS is
+its own; store_rss_kb is the growth of the peak over the interpreter with the
+workload already generated, i.e. the memory of the store (and the latency
+samples) rather than of the pre-generated commands.
+
+Usage: python benchmark.py [--levels L1 L4 compact] [--operations 100000] ... [--output results.json]
+"""
+import argparse
+import itertools
+import json
+import multiprocessing
+import random
+import resource
+import time
+from bisect import bisect
+from executor import CommandExecutor
+
+LEVELS = {
+    "L1": ("level1", "L1InMemoryDatabase"),
+    "L2": ("level2", "L2InMemoryDatabase"),
+    "L3": ("level3", "L3InMemoryDatabase"),
+    "L4": ("level4", "L4InMemoryDatabase"),
+    "compact": ("compact", "CompactInMemoryDatabase"),
+}
+# L1 has no SCAN; only L3 and up take timestamps, only L4 and up back up
+TIMESTAMPED = {"L3", "L4", "compact"}
+BACKUPS = {"L4", "compact"}
+
+
+class ZipfianGenerator:
+    """Draws integers in [0, n) where i is drawn with probability proportional to 1 / (i + 1) ** theta."""
+
+    def __init__(self, n, theta, rnd):
+        self.cdf = list(itertools.accumulate(1 / (i + 1) ** theta for i in range(n)))
+        self.rnd = rnd
+
+    def __call__(self):
+        return min(bisect(self.cdf, self.rnd.random() * self.cdf[-1]), len(self.cdf) - 1)
+
+
+def generate_workload(level, operations=100000, records=1000, fields=16, read=0.6, write=0.3, scan=0.1,
+                      zipf_theta=0.99, ttl_ratio=0.2, ttl_range=(100, 10000), backup_every=10000,
+                      restore_every=50000, seed=0):
+    """Return (load queries, run queries) for level."""
+    rnd = random.Random(seed)
+    timestamped = level in TIMESTAMPED
+    if level == "L1":
+        scan = 0
+    clock = itertools.count(1)
+    pick_record = ZipfianGenerator(records, zipf_theta, rnd)
+
+    def write_query(key, field):
+        value = f"v{rnd.randrange(1 << 20)}"
+        if not timestamped:
+            return ["SET", key, field, value]
+        if rnd.random() < ttl_ratio:
+            return ["SET_AT_WITH_TTL", key, field, value, next(clock), rnd.randint(*ttl_range)]
+        return ["SET_AT", key, field, value, next(clock)]
+
+    load = [write_query(f"user{i}", f"field{j}") for i in range(records) for j in range(fields)]
+    run, backups = [], []
+    for n in range(1, operations + 1):
+        if level in BACKUPS and restore_every and n % restore_every == 0 and backups:
+            run.append(["RESTORE", next(clock), rnd.choice(backups)])
+            continue
+        if level in BACKUPS and backup_every and n % backup_every == 0:
+            backups.append(next(clock))
+            run.append(["BACKUP", backups[-1]])
+            continue
+        key, field = f"user{pick_record()}", f"field{rnd.randrange(fields)}"
+        op = rnd.random() * (read + write + scan)
+        if op < read:
+            run.append(["GET_AT", key, field, next(clock)] if timestamped else ["GET", key, field])
+        elif op < read + write:
+            run.append(write_query(key, field))
+        else:
+            prefix = f"field{rnd.randrange(10)}"
+            run.append(["SCAN_BY_PREFIX_AT", key, prefix, next(clock)] if timestamped
+                       else ["SCAN_BY_PREFIX", key, prefix])
+    return load, run
+
+
+def _percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def run_level(level, **workload):
+    """Run the workload against a fresh database of level and return its measurements."""
+    module, name = LEVELS[level]
+    load, run = generate_workload(level, **workload)
+    # Peak RSS with the workload generated but no store yet
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    db = getattr(__import__(module), name)()
+    executor = CommandExecutor(db)
+    executor.execute(load)
+
+    handlers = executor.handlers
+    latencies = {}
+    clock = time.perf_counter_ns
+    start = clock()
+    for query in run:
+        begin = clock()
+        handlers[query[0]](*query[1:])
+        latencies.setdefault(query[0], []).append(clock() - begin)
+    elapsed = (clock() - start) / 1e9
+
+    commands = {}
+    for command, values in sorted(latencies.items()):
+        values.sort()
+        commands[command] = {
+            "count": len(values),
+            "p50_us": _percentile(values, 0.5) / 1000,
+            "p99_us": _percentile(values, 0.99) / 1000,
+            "p999_us": _percentile(values, 0.999) / 1000,
+        }
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "level": level,
+        "operations": len(run),
+        "ops_per_sec": len(run) / elapsed,
+        "peak_rss_kb": peak_rss,
+        "store_rss_kb": peak_rss - baseline_rss,
+        "commands": commands,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--levels", nargs="+", default=list(LEVELS), choices=list(LEVELS))
+    parser.add_argument("--operations", type=int, default=100000)
+    parser.add_argument("--records", type=int, default=1000)
+    parser.add_argument("--fields", type=int, default=16)
+    parser.add_argument("--read", type=float, default=0.6)
+    parser.add_argument("--write", type=float, default=0.3)
+    parser.add_argument("--scan", type=float, default=0.1)
+    parser.add_argument("--zipf-theta", type=float, default=0.99)
+    parser.add_argument("--ttl-ratio", type=float, default=0.2)
+    parser.add_argument("--ttl-range", type=int, nargs=2, default=(100, 10000))
+    parser.add_argument("--backup-every", type=int, default=10000)
+    parser.add_argument("--restore-every", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON results to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    workload = {name: value for name, value in vars(args).items() if name not in ("levels", "output")}
+    workload["ttl_range"] = tuple(workload["ttl_range"])
+    # A fresh interpreter per level keeps the peak RSS measurements independent
+    results = []
+    for level in args.levels:
+        with multiprocessing.get_context("spawn").Pool(1) as pool:
+            results.append(pool.apply(run_level, (level,), workload))
+    report = json.dumps({"workload": workload, "results": results}, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+asyncio client for server.py with connection pooling and pipelining.
+
+    client = Client("127.0.0.1", 6380, pool_size=4)
+    await client.execute("SET_AT", "A", "B", "C", 1)
+    await client.pipeline([["SET_AT", "A", "D", "E", 2], ["SCAN_AT", "A", 3]])
+
+execute() sends one command on a pooled connection. pipeline() sends a whole
+batch on one connection in a single write and reads all the replies in one round
+trip. Error replies raise ServerError (for a pipeline, after every reply was read).
+"""
+import asyncio
+from protocol import ServerError, encode_request, read_replies
+
+
+class Client:
+    def __init__(self, host="127.0.0.1", port=6380, pool_size=4):
+        self.host = host
+        self.port = port
+        self.pool_size = pool_size
+        self._idle = asyncio.LifoQueue()
+        self._opened = 0
+
+    async def _acquire(self):
+        if self._idle.empty() and self._opened < self.pool_size:
+            self._opened += 1
+            try:
+                return await asyncio.open_connection(self.host, self.port)
+            except BaseException:
+                self._opened -= 1
+                raise
+        return await self._idle.get()
+
+    async def pipeline(self, queries):
+        """Send queries in one round trip and return their replies in order."""
+        connection = await self._acquire()
+        reader, writer = connection
+        try:
+            writer.write(b"".join(encode_request(query) for query in queries))
+            await writer.drain()
+            replies = await read_replies(reader, len(queries))
+        except BaseException:
+            self._opened -= 1
+            writer.close()
+            raise
+        self._idle.put_nowait(connection)
+        for reply in replies:
+            if isinstance(reply, ServerError):
+                raise reply
+        return replies
+
+    async def execute(self, *query):
+        (reply,) = await self.pipeline([query])
+        return reply
+
+    async def close(self):
+        while not self._idle.empty():
+            reader, writer = self._idle.get_nowait()
+            writer.close()
+            await writer.wait_closed()
+        self._opened = 0
+
+
+if __name__ == "__main__":
+    import time
+    from server import DatabaseServer
+
+    async def main():
+        server = DatabaseServer()
+        port = await server.start()
+        client = Client(port=port)
+        print(await client.pipeline([
+            ["SET_AT_WITH_TTL", "A", "B", "C", 1, 10],
+            ["BACKUP", 3],
+            ["SET_AT", "A", "D", "E", 4],
+            ["MGET_AT", "A", "B", "D", 5],
+            ["RESTORE", 6, 3],
+            ["SCAN_AT", "A", 7]]))
+
+        n = 20000
+        start = time.perf_counter()
+        await asyncio.gather(*(client.pipeline([["SET_AT", f"K{i}", "F", "V", 10 + i]
+                                                for i in range(j, n, 10)]) for j in range(10)))
+        print(f"{n / (time.perf_counter() - start):,.0f} pipelined SET_AT/sec")
+        await client.close()
+        await server.close()
+
+    asyncio.run(main())
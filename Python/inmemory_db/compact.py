@@ -0,0 +1,203 @@
+"""
+Compact storage mode for L4InMemoryDatabase.
+
+The default layout stores every field as a (value, set_time) tuple in a per-record
+dict, plus an entry in a parallel ttl_data dict-of-dicts for fields with a TTL, and
+each SET brings its own copy of the field name string. CompactInMemoryDatabase
+keeps a record as columns instead:
+
+- slots: field -> column position; keys and field names are interned, so records
+  with the same fields (and the field index and expiry heap) share one string per name
+- values: list of values
+- set_times, expiries: array('q') columns of raw 8-byte timestamps instead of
+  int objects; fields without a TTL hold NO_EXPIRY, so ttl_data stays empty
+
+Removing a field moves the last column entry into its place. Records still read
+as mappings of field -> (value, set_time), so scans, backups and every command
+behave exactly like the default layout.
+
+`python compact.py` reports the resident bytes per field of both layouts.
+"""
+import sys
+from array import array
+from level4 import L4InMemoryDatabase
+
+NO_EXPIRY = (1 << 63) - 1
+
+
+class CompactRecord:
+    __slots__ = ("slots", "fields", "values", "set_times", "expiries", "ttl_count")
+
+    def __init__(self):
+        self.slots = {}
+        self.fields = []
+        self.values = []
+        self.set_times = array("q")
+        self.expiries = array("q")
+        self.ttl_count = 0
+
+    def __len__(self):
+        return len(self.fields)
+
+    def __contains__(self, field):
+        return field in self.slots
+
+    def __iter__(self):
+        return iter(self.fields)
+
+    def __getitem__(self, field):
+        slot = self.slots[field]
+        return self.values[slot], self.set_times[slot]
+
+    def get(self, field, default=None):
+        slot = self.slots.get(field)
+        return default if slot is None else (self.values[slot], self.set_times[slot])
+
+    def items(self):
+        return zip(self.fields, zip(self.values, self.set_times))
+
+    def __setitem__(self, field, entry):
+        value, set_time = entry
+        slot = self.slots.get(field)
+        if slot is None:
+            self.slots[field] = len(self.fields)
+            self.fields.append(field)
+            self.values.append(value)
+            self.set_times.append(set_time)
+            self.expiries.append(NO_EXPIRY)
+        else:
+            self.values[slot] = value
+            self.set_times[slot] = set_time
+
+    def update(self, entries):
+        for field, entry in entries:
+            self[field] = entry
+
+    def __delitem__(self, field):
+        slot = self.slots.pop(field)
+        if self.expiries[slot] != NO_EXPIRY:
+            self.ttl_count -= 1
+        last = len(self.fields) - 1
+        if slot != last:
+            moved = self.fields[last]
+            self.slots[moved] = slot
+            self.fields[slot] = moved
+            self.values[slot] = self.values[last]
+            self.set_times[slot] = self.set_times[last]
+            self.expiries[slot] = self.expiries[last]
+        self.fields.pop()
+        self.values.pop()
+        self.set_times.pop()
+        self.expiries.pop()
+
+    def expiry(self, field):
+        slot = self.slots.get(field)
+        if slot is None or self.expiries[slot] == NO_EXPIRY:
+            return None
+        return self.expiries[slot]
+
+    def set_expiry(self, field, expiry):
+        slot = self.slots[field]
+        if self.expiries[slot] == NO_EXPIRY:
+            self.ttl_count += 1
+        self.expiries[slot] = expiry
+
+    def discard_expiry(self, field):
+        slot = self.slots.get(field)
+        if slot is not None and self.expiries[slot] != NO_EXPIRY:
+            self.expiries[slot] = NO_EXPIRY
+            self.ttl_count -= 1
+
+    def ttl_items(self):
+        """Yield (field, expiry) for every field with a TTL."""
+        if self.ttl_count:
+            for field, expiry in zip(self.fields, self.expiries):
+                if expiry != NO_EXPIRY:
+                    yield field, expiry
+
+    def copy(self):
+        record = CompactRecord()
+        record.slots = self.slots.copy()
+        record.fields = self.fields.copy()
+        record.values = self.values.copy()
+        record.set_times = array("q", self.set_times)
+        record.expiries = array("q", self.expiries)
+        record.ttl_count = self.ttl_count
+        return record
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+
+class CompactInMemoryDatabase(L4InMemoryDatabase):
+    record_type = CompactRecord
+
+    # Keys and field names are interned before they reach the records, the field index
+    # or the expiry heap, so every copy of a name in the database is one shared string
+    def set_at(self, key, field, value, timestamp):
+        return super().set_at(sys.intern(key), sys.intern(field), value, timestamp)
+
+    def set_at_with_ttl(self, key, field, value, timestamp, ttl):
+        return super().set_at_with_ttl(sys.intern(key), sys.intern(field), value, timestamp, ttl)
+
+    def mset_at(self, key, items, timestamp):
+        items = {sys.intern(field): value for field, value in dict(items).items()}
+        return super().mset_at(sys.intern(key), items, timestamp)
+
+    def __str__(self):
+        ttl_data = {key: dict(record.ttl_items()) for key, record in self.database.items() if record.ttl_count}
+        return f"Database:{self.database}\tTTL:{ttl_data}"
+
+    def _expiry(self, key, field):
+        record = self.database.get(key)
+        return None if record is None else record.expiry(field)
+
+    def _set_expiry(self, key, field, expiry):
+        self.database[key].set_expiry(field, expiry)
+
+    def _discard_expiry(self, key, field):
+        # Removing a field from a record drops its expiry as well
+        record = self.database.get(key)
+        if record is not None:
+            record.discard_expiry(field)
+
+    def _ttl_entries(self):
+        for key, record in self.database.items():
+            for field, expiry in record.ttl_items():
+                yield expiry, key, field
+
+    def _restore_record(self, key, record, ttl, timestamp, restore_time):
+        super()._restore_record(key, record, ttl, timestamp, restore_time)
+        restored = self.database[key]
+        for field, expiry in record.ttl_items():
+            restored.set_expiry(field, timestamp + expiry - restore_time)
+
+
+def bytes_per_field(db_type, records=2000, fields=50, ttl_ratio=0.5):
+    """Traced bytes per field of a database filled with SET_AT / SET_AT_WITH_TTL."""
+    import gc
+    import tracemalloc
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    db = db_type()
+    timestamp = 1 << 40
+    for i in range(records):
+        for j in range(fields):
+            timestamp += 1
+            # Build the key and field names afresh, as a parser of incoming commands would
+            key, field = f"record{i}", f"field{j}"
+            if j < fields * ttl_ratio:
+                db.set_at_with_ttl(key, field, "value", timestamp, 1 << 20)
+            else:
+                db.set_at(key, field, "value", timestamp)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del db
+    return used / (records * fields)
+
+
+if __name__ == "__main__":
+    for db_type in (L4InMemoryDatabase, CompactInMemoryDatabase):
+        print(f"{db_type.__name__:<25} {bytes_per_field(db_type):7.1f} bytes/field")
@@ -0,0 +1,147 @@
+"""
+Batched command execution for the in-memory database levels.
+
+A query is a list such as ["SET_AT", "A", "B", "C", "1"]: the command name
+followed by its arguments as strings (ints are accepted as well). A text stream
+holds one query per line with whitespace-separated tokens, e.g. "SET_AT A B C 1".
+
+CommandExecutor(db) compiles the command table against db once: every command
+the database supports is bound to a handler that converts its timestamp/ttl
+arguments with int() and calls the bound method directly, so running a query is
+a single dictionary lookup and call.
+
+Bulk commands amortize the per-call overhead over many fields of one record:
+
+MSET <key> <field1> <value1> <field2> <value2> ... — SET for several fields.
+MGET <key> <field1> <field2> ... — returns the list of values, "" for missing fields.
+MSET_AT <key> <field1> <value1> ... <timestamp> — SET_AT for several fields.
+MGET_AT <key> <field1> <field2> ... <timestamp> — GET_AT for several fields.
+
+INFO is available on databases with instrumentation enabled (instrumentation.py).
+"""
+from itertools import islice
+
+# Command name -> (database method, positions of the arguments converted with int())
+COMMANDS = {
+    "SET": ("set", ()),
+    "GET": ("get", ()),
+    "DELETE": ("delete", ()),
+    "SCAN": ("scan", ()),
+    "SCAN_BY_PREFIX": ("scan_by_prefix", ()),
+    "SET_AT": ("set_at", (3,)),
+    "SET_AT_WITH_TTL": ("set_at_with_ttl", (3, 4)),
+    "GET_AT": ("get_at", (2,)),
+    "DELETE_AT": ("delete_at", (2,)),
+    "SCAN_AT": ("scan_at", (1,)),
+    "SCAN_BY_PREFIX_AT": ("scan_by_prefix_at", (2,)),
+    "BACKUP": ("backup", (0,)),
+    "RESTORE": ("restore", (0, 1)),
+    "GET_AS_OF": ("get_as_of", (2,)),
+    "SCAN_AS_OF": ("scan_as_of", (1,)),
+    "SCAN_BY_PREFIX_AS_OF": ("scan_by_prefix_as_of", (2,)),
+    "FIND_AT": ("find_at", (2,)),
+    "KEYS_BY_PREFIX_AT": ("keys_by_prefix_at", (1,)),
+    "KEYS_IN_RANGE_AT": ("keys_in_range_at", (2,)),
+    "INFO": ("info", ()),
+}
+
+
+class _HandlerTable(dict):
+    def __missing__(self, command):
+        raise ValueError(f"Unknown command: {command}")
+
+
+def _bind(method, int_positions):
+    if not int_positions:
+        return method
+    if int_positions == (0,):
+        return lambda timestamp: method(int(timestamp))
+
+    def handler(*args):
+        args = list(args)
+        for i in int_positions:
+            args[i] = int(args[i])
+        return method(*args)
+    return handler
+
+
+def _pairs(command, tokens):
+    """The (field, value) pairs of the flat tokens of an MSET command."""
+    if len(tokens) % 2:
+        raise ValueError(f"{command} expects field value pairs, got {len(tokens)} tokens")
+    return zip(tokens[::2], tokens[1::2])
+
+
+def _bulk_handlers(db):
+    handlers = {}
+    if hasattr(db, "mset"):
+        handlers["MSET"] = lambda key, *pairs: db.mset(key, _pairs("MSET", pairs))
+        handlers["MGET"] = lambda key, *fields: db.mget(key, fields)
+    if hasattr(db, "mset_at"):
+        handlers["MSET_AT"] = lambda key, *args: db.mset_at(key, _pairs("MSET_AT", args[:-1]), int(args[-1]))
+        handlers["MGET_AT"] = lambda key, *args: db.mget_at(key, args[:-1], int(args[-1]))
+    return handlers
+
+
+def parse_queries(stream):
+    """Yield the queries of a text stream, one per non-empty line."""
+    for line in stream:
+        tokens = line.split()
+        if tokens:
+            yield tokens
+
+
+class CommandExecutor:
+    def __init__(self, db, batch_size=4096):
+        self.db = db
+        self.batch_size = batch_size
+        self.handlers = _HandlerTable(
+            (command, _bind(getattr(db, method), int_positions))
+            for command, (method, int_positions) in COMMANDS.items()
+            if hasattr(db, method)
+        )
+        self.handlers.update(_bulk_handlers(db))
+
+    def execute_one(self, query):
+        return self.handlers[query[0]](*query[1:])
+
+    def execute(self, queries):
+        """Run queries (a list, any iterable, or a text stream) and return their results in order."""
+        if hasattr(queries, "read"):
+            queries = parse_queries(queries)
+        if isinstance(queries, (list, tuple)):
+            return self._run_batch(queries)
+        results = []
+        queries = iter(queries)
+        while batch := list(islice(queries, self.batch_size)):
+            results += self._run_batch(batch)
+        return results
+
+    def _run_batch(self, batch):
+        handlers = self.handlers
+        results = [None] * len(batch)
+        for i, query in enumerate(batch):
+            results[i] = handlers[query[0]](*query[1:])
+        return results
+
+    def execute_many(self, command, arguments):
+        """Run one command over many argument lists, resolving its handler only once."""
+        handler = self.handlers[command]
+        return [handler(*args) for args in arguments]
+
+
+if __name__ == "__main__":
+    import io
+    from level4 import L4InMemoryDatabase
+
+    executor = CommandExecutor(L4InMemoryDatabase())
+    stream = io.StringIO("""
+        MSET_AT A B C D E 1
+        BACKUP 2
+        SET_AT_WITH_TTL A F G 3 10
+        MGET_AT A B D F X 4
+        RESTORE 5 2
+        SCAN_AT A 6
+    """)
+    print(executor.execute(stream))
+    print(executor.execute_many("GET_AT", [("A", "B", 7), ("A", "D", 8), ("A", "F", 9)]))
@@ -0,0 +1,80 @@
+"""
+Secondary indexes for L3InMemoryDatabase and up.
+
+    db.indexes = SecondaryIndexes(db.database, fields=["email", "country"])
+
+FIND_AT <field> <value> <timestamp> — the keys whose record has field set to
+value, as "<key1>, <key2>, ..." sorted lexicographically. Only indexed fields
+can be searched.
+
+KEYS_BY_PREFIX_AT <prefix> <timestamp> — the keys of all records starting with
+prefix, in the same format.
+
+KEYS_IN_RANGE_AT <start> <end> <timestamp> — the keys of all records in the
+range [start, end), in the same format.
+
+Every indexed field has an inverted index value -> sorted keys, and the keys of
+all records are kept in one sorted list, so these queries cost O(log n + k)
+instead of a pass over the whole database. Every change to a record goes through the
+database's _touch(key) hook (SET_AT, DELETE_AT, TTL expiry), which only marks the
+key; marked keys are re-indexed from their record at the next query. RESTORE
+re-indexes the whole database.
+"""
+from bisect import bisect_left, insort
+from level2 import with_prefix
+
+
+class SecondaryIndexes:
+    def __init__(self, database, fields=()):
+        self.fields = list(fields)
+        self.reset(database)
+
+    def reset(self, database):
+        """Index every record of database afresh."""
+        # field -> value -> sorted list of the keys whose record has field set to value
+        self.values = {field: {} for field in self.fields}
+        # key -> {field: value} as currently indexed
+        self.indexed = {}
+        self.keys = sorted(database)
+        self.pending = set(database)
+
+    def touch(self, key):
+        self.pending.add(key)
+
+    def refresh(self, database):
+        """Re-index the records marked since the previous refresh."""
+        for key in self.pending:
+            self._reindex(key, database.get(key))
+        self.pending.clear()
+
+    def _reindex(self, key, record):
+        for field, value in self.indexed.pop(key, {}).items():
+            keys = self.values[field][value]
+            del keys[bisect_left(keys, key)]
+            if not keys:
+                del self.values[field][value]
+        i = bisect_left(self.keys, key)
+        present = i < len(self.keys) and self.keys[i] == key
+        if record is None:
+            if present:
+                del self.keys[i]
+            return
+        if not present:
+            self.keys.insert(i, key)
+        indexed = {field: record[field][0] for field in self.fields if field in record}
+        for field, value in indexed.items():
+            insort(self.values[field].setdefault(value, []), key)
+        if indexed:
+            self.indexed[key] = indexed
+
+    def find(self, field, value):
+        if field not in self.values:
+            raise ValueError(f"Field {field} is not indexed")
+        return list(self.values[field].get(value, ()))
+
+    def keys_by_prefix(self, prefix):
+        return with_prefix(self.keys, prefix)
+
+    def keys_in_range(self, start, end):
+        i = bisect_left(self.keys, start)
+        return self.keys[i:max(i, bisect_left(self.keys, end))]
@@ -0,0 +1,216 @@
+"""
+Opt-in instrumentation of a database instance.
+
+    stats = Instrumentation(db)
+    stats.enable()
+    ...
+    print(db.info())
+
+While enabled, every command method of db is shadowed by an instance attribute
+that records, per command: call count, a latency histogram, and for scans the
+number of fields returned. It also counts the fields evicted by TTL expiry and
+records how many records each BACKUP had to version (the snapshot size). A command
+called from inside another one (SET_AT_WITH_TTL calls SET_AT) is only counted as
+the outer command.
+
+Disabled is the default, and disable() removes the instance attributes again, so
+a database that is not instrumented runs its class methods directly at no cost.
+Enable instrumentation before building a CommandExecutor or a server on db: they
+bind the methods once.
+
+Listeners added with add_listener(callback) are called as
+callback(command, elapsed_ns, result) after every recorded command, e.g. to
+forward measurements to an external metrics system; stats() returns everything
+as a dict for polling exporters.
+"""
+import time
+from executor import COMMANDS
+
+SCANS = {"scan", "scan_by_prefix", "scan_at", "scan_by_prefix_at"}
+
+
+def _field_count(result):
+    """Number of fields in a scan result "<field1>(<value1>), <field2>(<value2>), ..."."""
+    return result.count("), ") + 1 if result else 0
+
+
+class LatencyHistogram:
+    """HDR-style histogram: values below 128 are counted exactly, larger ones in
+    log-linear buckets of 64 per power of two, so any recorded value is reported
+    within 1.6% of its true value."""
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    @staticmethod
+    def _bucket(value):
+        if value < 128:
+            return value
+        shift = value.bit_length() - 7
+        return (shift << 6) + (value >> shift)
+
+    @staticmethod
+    def _bucket_value(bucket):
+        """The largest value counted in bucket."""
+        if bucket < 128:
+            return bucket
+        shift = (bucket >> 6) - 1
+        return ((bucket - (shift << 6) + 1) << shift) - 1
+
+    def record(self, value):
+        bucket = self._bucket(value)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def percentile(self, q):
+        if not self.count:
+            return 0
+        rank = max(1, round(q * self.count))
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                return min(self._bucket_value(bucket), self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0,
+            "min": self.min or 0,
+            "p50": self.percentile(0.5),
+            "p99": self.percentile(0.99),
+            "p999": self.percentile(0.999),
+            "max": self.max or 0,
+        }
+
+
+class Instrumentation:
+    def __init__(self, db):
+        self.db = db
+        self.enabled = False
+        self.listeners = []
+        self.reset()
+
+    def reset(self):
+        self.latencies = {}
+        self.scan_sizes = {}
+        self.snapshot_records = LatencyHistogram()
+        self.evicted_fields = 0
+        self._depth = 0
+
+    def add_listener(self, callback):
+        self.listeners.append(callback)
+
+    def enable(self):
+        if self.enabled:
+            return
+        methods = [method for method, int_positions in COMMANDS.values() if method != "info"]
+        methods += ["mset", "mget", "mset_at", "mget_at"]
+        for method in methods:
+            if hasattr(self.db, method):
+                setattr(self.db, method, self._wrap(method, getattr(self.db, method)))
+        if hasattr(self.db, "_clean_expired"):
+            self.db._clean_expired = self._wrap_clean_expired(self.db._clean_expired)
+        self.db.info = self.info
+        self.enabled = True
+
+    def disable(self):
+        for name in list(vars(self.db)):
+            if getattr(vars(self.db)[name], "__instrumented__", False):
+                delattr(self.db, name)
+        vars(self.db).pop("info", None)
+        self.enabled = False
+
+    def _wrap(self, method, call):
+        command = method.upper()
+        histogram = self.latencies.setdefault(command, LatencyHistogram())
+        clock = time.perf_counter_ns
+        db = self.db
+
+        def instrumented(*args):
+            if self._depth:
+                return call(*args)
+            self._depth += 1
+            if method == "backup":
+                self.snapshot_records.record(len(getattr(db, "_dirty", ())))
+            start = clock()
+            try:
+                result = call(*args)
+            finally:
+                elapsed = clock() - start
+                self._depth -= 1
+            histogram.record(elapsed)
+            if method in SCANS:
+                self.scan_sizes.setdefault(command, LatencyHistogram()).record(_field_count(result))
+            for listener in self.listeners:
+                listener(command, elapsed, result)
+            return result
+        instrumented.__instrumented__ = True
+        return instrumented
+
+    def _wrap_clean_expired(self, call):
+        def instrumented(timestamp):
+            evicted = call(timestamp)
+            self.evicted_fields += evicted
+            return evicted
+        instrumented.__instrumented__ = True
+        return instrumented
+
+    def stats(self):
+        return {
+            "commands": {command: histogram.summary() for command, histogram in sorted(self.latencies.items())
+                         if histogram.count},
+            "scan_result_fields": {command: histogram.summary()
+                                   for command, histogram in sorted(self.scan_sizes.items())},
+            "snapshot_records": self.snapshot_records.summary(),
+            "evicted_fields": self.evicted_fields,
+            "scan_cache": self.db.scan_cache.stats() if getattr(self.db, "scan_cache", None) else None,
+        }
+
+    def info(self):
+        """INFO-style dump of the statistics: one "name:value" line per statistic, by section."""
+        stats = self.stats()
+        lines = ["# Commands"]
+        for command, summary in stats["commands"].items():
+            lines.append(f"cmdstat_{command.lower()}:calls={summary['count']},usec_per_call={summary['mean'] / 1000:.2f},"
+                         f"p50_usec={summary['p50'] / 1000:.2f},p99_usec={summary['p99'] / 1000:.2f},"
+                         f"p999_usec={summary['p999'] / 1000:.2f}")
+        lines.append("# Scans")
+        for command, summary in stats["scan_result_fields"].items():
+            lines.append(f"scanstat_{command.lower()}:calls={summary['count']},fields_per_call={summary['mean']:.2f},"
+                         f"max_fields={summary['max']}")
+        lines.append("# Expiry")
+        lines.append(f"evicted_fields:{stats['evicted_fields']}")
+        lines.append("# Backups")
+        snapshot = stats["snapshot_records"]
+        lines.append(f"backups:{snapshot['count']}")
+        lines.append(f"records_per_backup:{snapshot['mean']:.2f}")
+        lines.append(f"max_records_per_backup:{snapshot['max']}")
+        if stats["scan_cache"] is not None:
+            lines.append("# Scan cache")
+            lines += [f"scan_cache_{name}:{value}" for name, value in stats["scan_cache"].items()]
+        return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    from benchmark import generate_workload
+    from executor import CommandExecutor
+    from level4 import L4InMemoryDatabase
+
+    db = L4InMemoryDatabase()
+    Instrumentation(db).enable()
+    load, run = generate_workload("L4", operations=50000)
+    executor = CommandExecutor(db)
+    executor.execute(load)
+    executor.execute(run)
+    print(db.info())
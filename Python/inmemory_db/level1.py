@@ -37,10 +37,23 @@ class L1InMemoryDatabase:
             return True
         return False
 
+    def mset(self, key, items):
+        """Insert several field-value pairs into the record associated with key at once."""
+        self.database.setdefault(key, dict()).update(items)
+        return ""
+
+    def mget(self, key, fields):
+        """Return the values of several fields of the record associated with key."""
+        record = self.database.get(key, {})
+        return [record.get(field, "") for field in fields]
+
 if __name__ == "__main__":
 
+    from executor import CommandExecutor
+
     # Example usage
     db = L1InMemoryDatabase()
+    executor = CommandExecutor(db)
     queries = [
         ["SET", "A", "B", "E"],
         ["SET", "A", "C", "F"],
@@ -52,13 +65,5 @@ if __name__ == "__main__":
     # Execute queries and print the results
     for query in queries:
         print(query,end="\t")
-        command = query[0]
-        if command == "SET":
-            print("Result:\t",db.set(query[1], query[2], query[3]),end="\t")
-        elif command == "GET":
-            print("Result:\t",db.get(query[1], query[2]),end="\t")
-        elif command == "DELETE":
-            print("Result:\t",db.delete(query[1], query[2]),end="\t")
-        else:
-            print("#")
+        print("Result:\t",executor.execute_one(query),end="\t")
         print("DATABASE STATE:",db.database)
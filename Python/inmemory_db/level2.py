@@ -16,31 +16,96 @@ prefix should be included.
 The returned string should be in the same format as
 in the SCAN operation with fields sorted in lexicographical order.
 """
+from bisect import bisect_left
 from level1 import L1InMemoryDatabase
 
+
+def with_prefix(strings, prefix):
+    """The strings of the sorted list strings that start with prefix."""
+    if not prefix:
+        return strings
+    start = bisect_left(strings, prefix)
+    # Every string starting with prefix sorts before prefix with its last character incremented
+    if prefix[-1] == chr(0x10FFFF):
+        end = start
+        while end < len(strings) and strings[end].startswith(prefix):
+            end += 1
+    else:
+        end = bisect_left(strings, prefix[:-1] + chr(ord(prefix[-1]) + 1), start)
+    return strings[start:end]
+
+
 class L2InMemoryDatabase(L1InMemoryDatabase):
     def __init__(self):
         super().__init__()
+        # Fields of every record kept sorted lexicographically, so scans never sort
+        self.field_index = {}
+
+    def _index_add(self, key, field):
+        """Insert field into the sorted field index of key (no-op if present)."""
+        fields = self.field_index.setdefault(key, [])
+        i = bisect_left(fields, field)
+        if i == len(fields) or fields[i] != field:
+            fields.insert(i, field)
+
+    def _index_discard(self, key, field):
+        """Remove field from the sorted field index of key (no-op if absent)."""
+        fields = self.field_index.get(key)
+        if fields is None:
+            return
+        i = bisect_left(fields, field)
+        if i < len(fields) and fields[i] == field:
+            del fields[i]
+            if not fields:
+                del self.field_index[key]
+
+    def _index_add_many(self, key, fields):
+        """Insert fields missing from the record of key into its sorted field index."""
+        record = self.database.get(key, {})
+        missing = sorted({field for field in fields if field not in record})
+        if len(missing) < 8:
+            for field in missing:
+                self._index_add(key, field)
+        elif missing:
+            # Two sorted runs: timsort merges them in linear time
+            index = self.field_index.setdefault(key, [])
+            index += missing
+            index.sort()
+
+    def _fields_with_prefix(self, key, prefix):
+        """Sorted fields of key starting with prefix, found by range lookup in O(log n + k)."""
+        return with_prefix(self.field_index.get(key, []), prefix)
+
+    def set(self, key, field, value):
+        self._index_add(key, field)
+        return super().set(key, field, value)
+
+    def delete(self, key, field):
+        deleted = super().delete(key, field)
+        if deleted:
+            self._index_discard(key, field)
+        return deleted
+
+    def mset(self, key, items):
+        items = dict(items)
+        self._index_add_many(key, items)
+        return super().mset(key, items)
 
     def scan(self, key):
-        if key not in self.database:
-            return ""
-        # Sort lexicographically by field names
-        fields = sorted(self.database[key].items())
-        return ", ".join(f"{field}({value})" for field, value in fields)
+        return self.scan_by_prefix(key, "")
 
     def scan_by_prefix(self, key, prefix):
         if key not in self.database:
             return ""
-        fields = sorted(
-            (field, value) for field, value in self.database[key].items()
-            if field.startswith(prefix)
-        )
-        return ", ".join(f"{field}({value})" for field, value in fields)
+        record = self.database[key]
+        return ", ".join(f"{field}({record[field]})" for field in self._fields_with_prefix(key, prefix))
 
 if __name__ == "__main__":
+    from executor import CommandExecutor
+
     # Example usage
     db = L2InMemoryDatabase()
+    executor = CommandExecutor(db)
     queries = [
         ["SET", "A", "BC", "E"],
         ["SET", "A", "BD", "F"],
@@ -53,16 +118,6 @@ if __name__ == "__main__":
     # Execute queries and print the results
     for query in queries:
         print(f"Query:{query}",end="\t")
-        command = query[0]
-        if command == "SET":
-            print("Result:",db.set(query[1], query[2], query[3]),end="\t")  # returns ""
-        elif command == "GET":
-            print("Result:",db.get(query[1], query[2]),end="\t")  # returns the value or ""
-        elif command == "DELETE":
-            print("Result:",db.delete(query[1], query[2]),end="\t")  # returns "true" or "false"
-        elif command == "SCAN":
-            print("Result:",db.scan(query[1]),end="\t")  # returns fields as a string or ""
-        elif command == "SCAN_BY_PREFIX":
-            print("Result:",db.scan_by_prefix(query[1], query[2]),end="\t")  # returns fields with prefix as a string or ""
+        print("Result:",executor.execute_one(query),end="\t")
 
         print("DATABASE STATE:",db.database)
\ No newline at end of file
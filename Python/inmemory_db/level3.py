@@ -34,80 +34,170 @@ SCAN_BY_PREFIX_AT <key> <prefix> <timestamp> — the same as
 
 SCAN_BY_PREFIX, but with timestamp of the operation specified.
 """
+import heapq
 from level2 import L2InMemoryDatabase
 class L3InMemoryDatabase(L2InMemoryDatabase):
+    # Container of one record: maps field -> (value, set_time)
+    record_type = dict
+
     def __init__(self):
         super().__init__()
         self.ttl_data = {}
+        # Min-heap of (expiry, key, field) over all TTL'd fields of the database.
+        # Entries left behind by overwrites and deletes are skipped lazily when popped.
+        self.expiry_heap = []
+        # Optional ScanCache (scan_cache.py) of scan results
+        self.scan_cache = None
+        # Optional SecondaryIndexes (indexes.py) for FIND_AT and the key queries
+        self.indexes = None
 
     def __str__(self):
         return f"Database:{self.database}\tTTL:{self.ttl_data}"
-    def _clean_expired(self, key, timestamp):
-        """Remove expired fields based on TTL."""
-        if key in self.ttl_data:
-            expired_fields = [
-                field for field, expiry in self.ttl_data[key].items() if expiry <= timestamp
-            ]
-            for field in expired_fields:
-                self.database[key].pop(field, None)
-                self.ttl_data[key].pop(field, None)
-            if not self.database[key]:
-                del self.database[key]
-            if not self.ttl_data[key]:
+
+    def _touch(self, key):
+        """Called before the record or the TTLs of key are modified."""
+        if self.scan_cache is not None:
+            self.scan_cache.invalidate(key)
+        if self.indexes is not None:
+            self.indexes.touch(key)
+
+    def _remove_field(self, key, field):
+        """Remove field and its TTL from the record of key, dropping emptied records."""
+        self._touch(key)
+        record = self.database[key]
+        del record[field]
+        if not record:
+            del self.database[key]
+        self._index_discard(key, field)
+        self._discard_expiry(key, field)
+
+    def _expiry(self, key, field):
+        """Expiry timestamp of field of key, or None if it has no TTL."""
+        ttl = self.ttl_data.get(key)
+        return None if ttl is None else ttl.get(field)
+
+    def _set_expiry(self, key, field, expiry):
+        self.ttl_data.setdefault(key, {})[field] = expiry
+
+    def _discard_expiry(self, key, field):
+        ttl = self.ttl_data.get(key)
+        if ttl is not None and field in ttl:
+            del ttl[field]
+            if not ttl:
                 del self.ttl_data[key]
 
+    def _ttl_entries(self):
+        """Yield (expiry, key, field) for every field with a TTL."""
+        for key, fields in self.ttl_data.items():
+            for field, expiry in fields.items():
+                yield expiry, key, field
+
+    def _record(self, key):
+        """The record of key, created empty if it does not exist."""
+        record = self.database.get(key)
+        if record is None:
+            record = self.database[key] = self.record_type()
+        return record
+
+    def _clean_expired(self, timestamp):
+        """Evict every field of the database whose TTL ended at or before timestamp.
+        Returns the number of evicted fields."""
+        heap = self.expiry_heap
+        evicted = 0
+        while heap and heap[0][0] <= timestamp:
+            expiry, key, field = heapq.heappop(heap)
+            if self._expiry(key, field) == expiry:
+                self._remove_field(key, field)
+                evicted += 1
+        return evicted
+
+    def _rebuild_expiry_heap(self):
+        """Rebuild the expiry heap from the TTLs, e.g. after they were replaced wholesale."""
+        self.expiry_heap = list(self._ttl_entries())
+        heapq.heapify(self.expiry_heap)
+
     def set_at(self, key, field, value, timestamp):
-        self._clean_expired(key, timestamp)
-        if key not in self.database:
-            self.database[key] = {}
-        self.database[key][field] = (value, timestamp)
+        self._clean_expired(timestamp)
+        self._touch(key)
+        self._record(key)[field] = (value, timestamp)
+        self._index_add(key, field)
         return ""
 
     def set_at_with_ttl(self, key, field, value, timestamp, ttl):
         self.set_at(key, field, value, timestamp)
-        if key not in self.ttl_data:
-            self.ttl_data[key] = {}
-        self.ttl_data[key][field] = timestamp + ttl
+        expiry = timestamp + ttl
+        self._set_expiry(key, field, expiry)
+        heapq.heappush(self.expiry_heap, (expiry, key, field))
+        return ""
+
+    def mset_at(self, key, items, timestamp):
+        """SET_AT for several field-value pairs of one record, cleaning expired fields once."""
+        items = dict(items)
+        self._clean_expired(timestamp)
+        self._touch(key)
+        self._index_add_many(key, items)
+        self._record(key).update((field, (value, timestamp)) for field, value in items.items())
         return ""
 
     def get_at(self, key, field, timestamp):
-        self._clean_expired(key, timestamp)
+        self._clean_expired(timestamp)
         if key in self.database and field in self.database[key]:
             value, set_time = self.database[key][field]
             return value
         return ""
 
+    def mget_at(self, key, fields, timestamp):
+        """GET_AT for several fields of one record, cleaning expired fields once."""
+        self._clean_expired(timestamp)
+        record = self.database.get(key, {})
+        return [record[field][0] if field in record else "" for field in fields]
+
     def delete_at(self, key, field, timestamp):
-        self._clean_expired(key, timestamp)
+        self._clean_expired(timestamp)
         if key in self.database and field in self.database[key]:
-            del self.database[key][field]
-            if field in self.ttl_data.get(key, {}):
-                del self.ttl_data[key][field]
-            if not self.database[key]:
-                del self.database[key]
+            self._remove_field(key, field)
             return "true"
         return "false"
 
     def scan_at(self, key, timestamp):
-        self._clean_expired(key, timestamp)
-        if key not in self.database:
-            return ""
-        fields = sorted((field, value[0]) for field, value in self.database[key].items())
-        return ", ".join(f"{field}({value})" for field, value in fields)
+        return self.scan_by_prefix_at(key, "", timestamp)
 
     def scan_by_prefix_at(self, key, prefix, timestamp):
-        self._clean_expired(key, timestamp)
+        self._clean_expired(timestamp)
+        cache = self.scan_cache
+        if cache is None:
+            return self._scan(key, prefix)
+        result = cache.get(key, prefix)
+        if result is None:
+            result = cache.put(key, prefix, self._scan(key, prefix))
+        return result
+
+    def _scan(self, key, prefix):
         if key not in self.database:
             return ""
-        fields = sorted(
-            (field, value[0])
-            for field, value in self.database[key].items()
-            if field.startswith(prefix)
-        )
-        return ", ".join(f"{field}({value})" for field, value in fields)
+        record = self.database[key]
+        return ", ".join(f"{field}({record[field][0]})" for field in self._fields_with_prefix(key, prefix))
+
+    def _indexes_at(self, timestamp):
+        self._clean_expired(timestamp)
+        if self.indexes is None:
+            raise ValueError("No secondary indexes on this database")
+        self.indexes.refresh(self.database)
+        return self.indexes
+
+    def find_at(self, field, value, timestamp):
+        return ", ".join(self._indexes_at(timestamp).find(field, value))
+
+    def keys_by_prefix_at(self, prefix, timestamp):
+        return ", ".join(self._indexes_at(timestamp).keys_by_prefix(prefix))
+
+    def keys_in_range_at(self, start, end, timestamp):
+        return ", ".join(self._indexes_at(timestamp).keys_in_range(start, end))
 
 
 if __name__ == "__main__":
+    from executor import CommandExecutor
+
     # Example usage
     examples= [[
         ["SET_AT_WITH_TTL", "A", "BC", "E", "1", "9"],
@@ -125,23 +215,12 @@ if __name__ == "__main__":
 
     for queries in examples:
         db = L3InMemoryDatabase()
+        executor = CommandExecutor(db)
 
         # Execute queries and print the results
         for query in queries:
-            command = query[0]
             print(query,end="\t")
-            if command == "SET_AT":
-                print(db.set_at(query[1], query[2], query[3], int(query[4])),end="\t")  # returns ""
-            elif command == "SET_AT_WITH_TTL":
-                print(db.set_at_with_ttl(query[1], query[2], query[3], int(query[4]), int(query[5])),end="\t")  # returns ""
-            elif command == "GET_AT":
-                print(db.get_at(query[1], query[2], int(query[3])),end="\t")  # returns value or ""
-            elif command == "DELETE_AT":
-                print(db.delete_at(query[1], query[2], int(query[3])),end="\t")  # returns "true" or "false"
-            elif command == "SCAN_AT":
-                print(db.scan_at(query[1], int(query[2])),end="\t")  # returns fields as a string or ""
-            elif command == "SCAN_BY_PREFIX_AT":
-                print(db.scan_by_prefix_at(query[1], query[2], int(query[3])),end="\t")  # returns fields with prefix as a string or ""
+            print(executor.execute_one(query),end="\t")
 
             print("DATABASE STATE:", db)
         print("\n\n")
@@ -13,50 +13,112 @@ operation - since the database timeline always flows forward, restored records
 and fields should expire after the timestamp of this operation, depending on
 their remaining ttls at backup. This operation should return an empty string.
 """
+from bisect import bisect_right
 from level3 import L3InMemoryDatabase
 class L4InMemoryDatabase(L3InMemoryDatabase):
-    def __init__(self):
+    """Backups share unchanged records with the live database (copy-on-write), so a
+    BACKUP costs O(records changed since the previous one) rather than O(database).
+    With max_backups set, only the latest max_backups backups are kept."""
+
+    def __init__(self, max_backups=None):
         super().__init__()
-        self.backups = {}
+        self.max_backups = max_backups
+        # Sorted timestamps of the retained backups
+        self.backups = []
+        # key -> (backup timestamps, states): version chain of the record of key, where
+        # a state is (record, ttl) as of that backup or None if the record did not exist
+        self.versions = {}
+        # Keys changed since the last backup, and keys whose dicts no backup shares
+        self._dirty = set()
+        self._owned = set()
+        self._dropped = 0
+
+    def _touch(self, key):
+        super()._touch(key)
+        if key not in self._owned:
+            if key in self.database:
+                self.database[key] = self.database[key].copy()
+            if key in self.ttl_data:
+                self.ttl_data[key] = self.ttl_data[key].copy()
+            self._owned.add(key)
+        self._dirty.add(key)
+
+    def _prune(self, key):
+        """Drop the versions of key that no retained backup can restore."""
+        times, states = self.versions[key]
+        i = bisect_right(times, self.backups[0]) - 1
+        if i > 0:
+            del times[:i]
+            del states[:i]
+        if len(states) == 1 and states[0] is None and times[0] <= self.backups[0]:
+            del self.versions[key]
+
+    def compact(self):
+        """Prune the version chains of every key against the retention window."""
+        for key in list(self.versions):
+            self._prune(key)
+        self._dropped = 0
 
     def backup(self, timestamp):
-        self._clean_expired(None, timestamp)
-        backup_state = {}
-        for key, fields in self.database.items():
-            backup_state[key] = {
-                field: (value[0], timestamp - set_time)  # Store value and remaining TTL
-                for field, (value, set_time) in fields.items()
-            }
-        self.backups[timestamp] = (backup_state, {k: v.copy() for k, v in self.ttl_data.items()})
-        return str(len([k for k in self.database if self.database[k]]))
+        self._clean_expired(timestamp)
+        self.backups.append(timestamp)
+        if self.max_backups is not None and len(self.backups) > self.max_backups:
+            excess = len(self.backups) - self.max_backups
+            del self.backups[:excess]
+            self._dropped += excess
+        for key in self._dirty:
+            times, states = self.versions.setdefault(key, ([], []))
+            times.append(timestamp)
+            if key in self.database:
+                states.append((self.database[key], self.ttl_data.get(key)))
+            else:
+                states.append(None)
+            self._prune(key)
+        # Every live record is now shared with this backup
+        self._dirty = set()
+        self._owned = set()
+        if self.max_backups is not None and self._dropped >= self.max_backups:
+            self.compact()
+        # Emptied records are always dropped, so every remaining record is non-empty and live
+        return str(len(self.database))
 
-    def restore(self, timestamp, timestamp_to_restore):
-        restore_time = max(t for t in self.backups if t <= timestamp_to_restore)
-        backup_state, backup_ttl = self.backups[restore_time]
+    def _restore_record(self, key, record, ttl, timestamp, restore_time):
+        """Make the backed-up record (and TTLs) of key live again as of timestamp."""
+        self._record(key).update((field, (value, timestamp)) for field, (value, set_time) in record.items())
+        if ttl:
+            self.ttl_data[key] = {field: timestamp + expiry - restore_time for field, expiry in ttl.items()}
 
-        # Restore database state
-        self.database = {
-            key: {
-                field: (value, timestamp)
-                for field, (value, remaining_ttl) in fields.items()
-            }
-            for key, fields in backup_state.items()
-        }
+    def restore(self, timestamp, timestamp_to_restore):
+        i = bisect_right(self.backups, timestamp_to_restore) - 1
+        if i < 0:
+            raise ValueError(f"No retained backup at or before {timestamp_to_restore}")
+        restore_time = self.backups[i]
 
-        # Restore TTL with recalculated expiration times
+        # Restore database state, with TTL expiration times recalculated from the remaining ttl
+        self.database = {}
         self.ttl_data = {}
-        for key, fields in backup_ttl.items():
-            for field, expiry in fields.items():
-                remaining_ttl = expiry - restore_time
-                if key not in self.ttl_data:
-                    self.ttl_data[key] = {}
-                self.ttl_data[key][field] = timestamp + remaining_ttl
+        for key, (times, states) in self.versions.items():
+            j = bisect_right(times, restore_time) - 1
+            if j < 0 or states[j] is None:
+                continue
+            self._restore_record(key, *states[j], timestamp, restore_time)
+        self.field_index = {key: sorted(fields) for key, fields in self.database.items()}
+        self._rebuild_expiry_heap()
+        if self.scan_cache is not None:
+            self.scan_cache.clear()
+        if self.indexes is not None:
+            self.indexes.reset(self.database)
+        self._owned = set(self.database)
+        self._dirty = set(self.versions) | self._owned
         return ""
 
 
 if __name__ == '__main__':
+    from executor import CommandExecutor
+
     # Example usage
     db = L4InMemoryDatabase()
+    executor = CommandExecutor(db)
     queries = [
         ["SET_AT_WITH_TTL", "A", "B", "C", "1", "10"],
         ["BACKUP", "3"],
@@ -71,23 +133,7 @@ if __name__ == '__main__':
 
     # Execute queries and print the results
     for query in queries:
-        command = query[0]
         print(query, end="\t")
-        if command == "SET_AT":
-            print("Result:\t",db.set_at(query[1], query[2], query[3], int(query[4])),end="\t")  # returns ""
-        elif command == "SET_AT_WITH_TTL":
-            print("Result:\t",db.set_at_with_ttl(query[1], query[2], query[3], int(query[4]), int(query[5])),end="\t")  # returns ""
-        elif command == "GET_AT":
-            print("Result:\t",db.get_at(query[1], query[2], int(query[3])),end="\t")  # returns value or ""
-        elif command == "DELETE_AT":
-            print("Result:\t",db.delete_at(query[1], query[2], int(query[3])),end="\t")  # returns "true" or "false"
-        elif command == "SCAN_AT":
-            print("Result:\t",db.scan_at(query[1], int(query[2])),end="\t")  # returns fields as a string or ""
-        elif command == "SCAN_BY_PREFIX_AT":
-            print("Result:\t",db.scan_by_prefix_at(query[1], query[2], int(query[3])),end="\t")  # returns fields with prefix as a string or ""
-        elif command == "BACKUP":
-            print("Result:\t",db.backup(int(query[1])),end="\t")  # returns number of non-empty records
-        elif command == "RESTORE":
-            print("Result:\t",db.restore(int(query[1]), int(query[2])),end="\t")  # returns ""
+        print("Result:\t",executor.execute_one(query),end="\t")
 
         print("DATABASE STATE:", db.database)
\ No newline at end of file
@@ -0,0 +1,205 @@
+"""
+In-memory database partitioned across worker processes, one shard per process.
+
+    with MultiProcessDatabase(workers=4) as db:
+        db.execute([["SET_AT", "A", "B", "C", 1], ["BACKUP", 2], ["SCAN_AT", "A", 3]])
+        db.get_at("A", "B", 4)
+
+Every worker owns a database (L4InMemoryDatabase by default) holding the keys
+that hash to it with crc32, which is stable across processes and runs, unlike
+hash() of a str. The router in the calling process splits a batch of queries by
+shard, sends every worker its part over its pipe at once and collects the results
+in order, so the workers run their parts in parallel and each pays one round trip
+per batch rather than per command. The single-command methods (set_at, get_at, ...)
+are a round trip each; batches are the fast path.
+
+BACKUP and RESTORE are barriers: the queries before them are finished on every
+shard, then all shards back up or restore at the same timestamp, so a backup is a
+consistent snapshot of the whole database. BACKUP returns the total record count.
+
+A failing query does not stop the rest of its batch: execute() raises the first
+error once every result of the batch is in.
+
+`python multiprocess.py` compares point-operation throughput with a single-process
+L4InMemoryDatabase behind a CommandExecutor.
+"""
+import multiprocessing
+from itertools import islice
+from zlib import crc32
+from executor import CommandExecutor
+from level4 import L4InMemoryDatabase
+
+BARRIERS = {"BACKUP", "RESTORE"}
+
+
+def _serve_shard(connection, shard_factory):
+    handlers = CommandExecutor(shard_factory()).handlers
+    while True:
+        batch = connection.recv()
+        if batch is None:
+            break
+        results = []
+        for query in batch:
+            try:
+                results.append(handlers[query[0]](*query[1:]))
+            except Exception as error:
+                results.append(error)
+        connection.send(results)
+    connection.close()
+
+
+def _keyed(command):
+    def method(self, key, *args):
+        return self.execute([[command, key, *args]])[0]
+    method.__name__ = command.lower()
+    return method
+
+
+class MultiProcessDatabase:
+    def __init__(self, workers=None, shard_factory=L4InMemoryDatabase, batch_size=65536):
+        self.batch_size = batch_size
+        # Memo of key -> shard, since hot keys come back batch after batch
+        self._shard_of = {}
+        self.connections = []
+        self.processes = []
+        for _ in range(workers or multiprocessing.cpu_count()):
+            connection, worker_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_serve_shard, args=(worker_connection, shard_factory),
+                                              daemon=True)
+            process.start()
+            worker_connection.close()
+            self.connections.append(connection)
+            self.processes.append(process)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        for connection in self.connections:
+            connection.send(None)
+            connection.close()
+        for process in self.processes:
+            process.join()
+        self.connections, self.processes = [], []
+
+    def shard_of(self, key):
+        return crc32(str(key).encode()) % len(self.connections)
+
+    def execute(self, queries):
+        """Run queries (any iterable) across the shards and return their results in order."""
+        results = []
+        queries = iter(queries)
+        while batch := list(islice(queries, self.batch_size)):
+            results += self._run_batch(batch)
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
+        return results
+
+    def _run_batch(self, batch):
+        results = [None] * len(batch)
+        start = 0
+        for i, query in enumerate(batch):
+            if query[0] in BARRIERS:
+                self._run_keyed(batch, start, i, results)
+                results[i] = self._run_barrier(query)
+                start = i + 1
+        self._run_keyed(batch, start, len(batch), results)
+        return results
+
+    def _run_keyed(self, batch, start, end, results):
+        shards = len(self.connections)
+        parts = [[] for _ in range(shards)]
+        positions = [[] for _ in range(shards)]
+        shard_of = self._shard_of
+        for i in range(start, end):
+            query = batch[i]
+            key = query[1] if len(query) > 1 else ""
+            shard = shard_of.get(key)
+            if shard is None:
+                if len(shard_of) >= 1 << 20:
+                    shard_of.clear()
+                shard = shard_of[key] = self.shard_of(key)
+            parts[shard].append(query)
+            positions[shard].append(i)
+        for connection, part in zip(self.connections, parts):
+            if part:
+                connection.send(part)
+        for connection, part, shard_positions in zip(self.connections, parts, positions):
+            if part:
+                for i, result in zip(shard_positions, connection.recv()):
+                    results[i] = result
+
+    def _run_barrier(self, query):
+        for connection in self.connections:
+            connection.send([query])
+        replies = [connection.recv()[0] for connection in self.connections]
+        for reply in replies:
+            if isinstance(reply, Exception):
+                return reply
+        if query[0] == "BACKUP":
+            return str(sum(int(reply) for reply in replies))
+        return ""
+
+    set = _keyed("SET")
+    get = _keyed("GET")
+    delete = _keyed("DELETE")
+    scan = _keyed("SCAN")
+    scan_by_prefix = _keyed("SCAN_BY_PREFIX")
+    set_at = _keyed("SET_AT")
+    set_at_with_ttl = _keyed("SET_AT_WITH_TTL")
+    get_at = _keyed("GET_AT")
+    delete_at = _keyed("DELETE_AT")
+    scan_at = _keyed("SCAN_AT")
+    scan_by_prefix_at = _keyed("SCAN_BY_PREFIX_AT")
+
+    def mset(self, key, items):
+        return self.execute([["MSET", key, *(token for pair in dict(items).items() for token in pair)]])[0]
+
+    def mget(self, key, fields):
+        return self.execute([["MGET", key, *fields]])[0]
+
+    def mset_at(self, key, items, timestamp):
+        return self.execute([["MSET_AT", key, *(token for pair in dict(items).items() for token in pair),
+                              timestamp]])[0]
+
+    def mget_at(self, key, fields, timestamp):
+        return self.execute([["MGET_AT", key, *fields, timestamp]])[0]
+
+    def backup(self, timestamp):
+        return self.execute([["BACKUP", timestamp]])[0]
+
+    def restore(self, timestamp, timestamp_to_restore):
+        return self.execute([["RESTORE", timestamp, timestamp_to_restore]])[0]
+
+
+def benchmark(worker_counts=(1, 2, 4, 8), operations=400000, batch_size=4096):
+    """Ops/sec of a GET_AT/SET_AT workload run in batches, single-process and for each worker count."""
+    import time
+    from benchmark import generate_workload
+
+    load, run = generate_workload("L4", operations=operations, records=10000, read=0.5, write=0.5, scan=0,
+                                  backup_every=0, restore_every=0)
+    batches = [run[i:i + batch_size] for i in range(0, len(run), batch_size)]
+
+    def measure(execute):
+        execute(load)
+        start = time.perf_counter()
+        for batch in batches:
+            execute(batch)
+        return len(run) / (time.perf_counter() - start)
+
+    results = {"single-process": measure(CommandExecutor(L4InMemoryDatabase()).execute)}
+    for workers in worker_counts:
+        with MultiProcessDatabase(workers) as db:
+            results[f"workers={workers}"] = measure(db.execute)
+    return results
+
+
+if __name__ == "__main__":
+    print(f"{multiprocessing.cpu_count()} cores")
+    for name, ops in benchmark().items():
+        print(f"{name:<15} {ops:>12,.0f} ops/sec")
@@ -0,0 +1,186 @@
+"""
+Point-in-time reads over the history of the database.
+
+GET_AS_OF <key> <field> <as_of> — the value the field had at timestamp as_of,
+or an empty string if it did not exist then (never set, deleted or expired).
+
+SCAN_AS_OF <key> <as_of> and SCAN_BY_PREFIX_AS_OF <key> <prefix> <as_of> — the
+same as SCAN_AT and SCAN_BY_PREFIX_AT, for the record as it was at as_of.
+
+MVCCInMemoryDatabase keeps, next to the live state, a version chain per field:
+the timestamps at which the field was written by SET_AT, SET_AT_WITH_TTL,
+MSET_AT, DELETE_AT or RESTORE, with the value and expiry (or deletion) each
+write left behind. A read as of a timestamp bisects the chain for the latest
+version at or before it, so audits of past state need no BACKUP or RESTORE and
+leave the live database untouched. TTLs are kept in the versions, so expiry
+needs no versions of its own.
+
+With horizon set, only reads at or after (latest timestamp - horizon) are
+answered; versions that no such read can see are garbage-collected when a chain
+is written and by a sweep of all chains once every horizon, and reads further
+back raise ValueError.
+"""
+from bisect import bisect_left, bisect_right, insort
+from level2 import with_prefix
+from level4 import L4InMemoryDatabase
+
+
+class MVCCInMemoryDatabase(L4InMemoryDatabase):
+    def __init__(self, max_backups=None, horizon=None):
+        super().__init__(max_backups)
+        self.horizon = horizon
+        # key -> (sorted fields, field -> (timestamps, versions)), where a version is
+        # (value, expiry or None) as of that timestamp, or None once the field was deleted
+        self.history = {}
+        self._now = None
+        self._next_sweep = None
+
+    def _add_version(self, key, field, timestamp, version):
+        fields, chains = self.history.setdefault(key, ([], {}))
+        chain = chains.get(field)
+        if chain is None:
+            insort(fields, field)
+            chain = chains[field] = ([], [])
+        times, versions = chain
+        # SET_AT_WITH_TTL first writes the field through SET_AT at the same timestamp
+        if times and times[-1] == timestamp:
+            versions[-1] = version
+        else:
+            times.append(timestamp)
+            versions.append(version)
+        if self.horizon is not None:
+            self._collect(key, field, timestamp - self.horizon)
+
+    def _advance(self, timestamp):
+        self._now = timestamp
+        if self.horizon is not None and (self._next_sweep is None or timestamp >= self._next_sweep):
+            self.collect_garbage()
+            self._next_sweep = timestamp + self.horizon
+
+    def _collect(self, key, field, cutoff):
+        """Drop the versions of field of key that no read at or after cutoff can see."""
+        fields, chains = self.history[key]
+        times, versions = chains[field]
+        i = bisect_right(times, cutoff) - 1
+        if i > 0:
+            del times[:i]
+            del versions[:i]
+        if len(times) == 1 and times[0] <= cutoff:
+            version = versions[0]
+            if version is None or version[1] is not None and version[1] <= cutoff:
+                del chains[field]
+                del fields[bisect_left(fields, field)]
+                if not fields:
+                    del self.history[key]
+
+    def collect_garbage(self):
+        """Collect the versions of every chain that fell behind the horizon."""
+        if self.horizon is None or self._now is None:
+            return
+        cutoff = self._now - self.horizon
+        for key, (fields, chains) in list(self.history.items()):
+            for field in list(fields):
+                self._collect(key, field, cutoff)
+
+    def _live_version(self, key, field):
+        return self.database[key][field][0], self._expiry(key, field)
+
+    def set_at(self, key, field, value, timestamp):
+        super().set_at(key, field, value, timestamp)
+        # SET_AT keeps the expiry of a field that had a TTL
+        self._add_version(key, field, timestamp, self._live_version(key, field))
+        self._advance(timestamp)
+        return ""
+
+    def set_at_with_ttl(self, key, field, value, timestamp, ttl):
+        super().set_at_with_ttl(key, field, value, timestamp, ttl)
+        self._add_version(key, field, timestamp, (value, timestamp + ttl))
+        return ""
+
+    def mset_at(self, key, items, timestamp):
+        items = dict(items)
+        super().mset_at(key, items, timestamp)
+        for field in items:
+            self._add_version(key, field, timestamp, self._live_version(key, field))
+        self._advance(timestamp)
+        return ""
+
+    def delete_at(self, key, field, timestamp):
+        deleted = super().delete_at(key, field, timestamp)
+        if deleted == "true":
+            self._add_version(key, field, timestamp, None)
+        self._advance(timestamp)
+        return deleted
+
+    def restore(self, timestamp, timestamp_to_restore):
+        before = {key: list(fields) for key, fields in self.field_index.items()}
+        super().restore(timestamp, timestamp_to_restore)
+        for key in before.keys() | self.field_index.keys():
+            for field in set(before.get(key, ())).union(self.field_index.get(key, ())):
+                version = self._live_version(key, field) if field in self.database.get(key, ()) else None
+                if version != self._version(key, field, timestamp):
+                    self._add_version(key, field, timestamp, version)
+        self._advance(timestamp)
+        return ""
+
+    def _version(self, key, field, as_of):
+        """The version of field of key visible at as_of, or None."""
+        history = self.history.get(key)
+        chain = history and history[1].get(field)
+        if not chain:
+            return None
+        times, versions = chain
+        i = bisect_right(times, as_of) - 1
+        return versions[i] if i >= 0 else None
+
+    def _check_as_of(self, as_of):
+        if self.horizon is not None and self._now is not None and as_of < self._now - self.horizon:
+            raise ValueError(f"History before {self._now - self.horizon} is no longer retained")
+
+    def get_as_of(self, key, field, as_of):
+        self._check_as_of(as_of)
+        version = self._version(key, field, as_of)
+        if version is None or version[1] is not None and version[1] <= as_of:
+            return ""
+        return version[0]
+
+    def scan_as_of(self, key, as_of):
+        return self.scan_by_prefix_as_of(key, "", as_of)
+
+    def scan_by_prefix_as_of(self, key, prefix, as_of):
+        self._check_as_of(as_of)
+        if key not in self.history:
+            return ""
+        fields, chains = self.history[key]
+        result = []
+        for field in with_prefix(fields, prefix):
+            times, versions = chains[field]
+            i = bisect_right(times, as_of) - 1
+            if i < 0 or versions[i] is None:
+                continue
+            value, expiry = versions[i]
+            if expiry is None or as_of < expiry:
+                result.append(f"{field}({value})")
+        return ", ".join(result)
+
+
+if __name__ == "__main__":
+    from executor import CommandExecutor
+
+    db = MVCCInMemoryDatabase()
+    executor = CommandExecutor(db)
+    queries = [
+        ["SET_AT", "A", "B", "C", "1"],
+        ["SET_AT_WITH_TTL", "A", "D", "E", "2", "5"],
+        ["BACKUP", "3"],
+        ["SET_AT", "A", "B", "F", "4"],
+        ["DELETE_AT", "A", "D", "5"],
+        ["RESTORE", "8", "3"],
+        ["SCAN_AS_OF", "A", "3"],
+        ["SCAN_AS_OF", "A", "5"],
+        ["SCAN_AS_OF", "A", "7"],
+        ["SCAN_AS_OF", "A", "8"],
+        ["GET_AS_OF", "A", "D", "10"],
+        ["GET_AS_OF", "A", "D", "11"]]
+    for query in queries:
+        print(query, "\t", executor.execute_one(query))
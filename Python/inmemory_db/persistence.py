@@ -0,0 +1,363 @@
+"""
+Durable persistence for the in-memory database: an append-only command log.
+
+Every mutating command (SET, DELETE, MSET, SET_AT, SET_AT_WITH_TTL, MSET_AT,
+DELETE_AT, BACKUP, RESTORE) is appended to the log after it executes. BACKUP is
+logged as well, since a later RESTORE depends on the backups taken before it.
+
+Frame layout (little endian):
+    <u32 payload length> <u32 crc32 of payload> <payload>
+    payload = <u8 opcode> <arguments>
+    string argument = <u32 byte length> <utf-8 bytes>, int argument = <i64>,
+    field-value pairs argument = <u32 count> <field string> <value string> ...
+    snapshot payload = <u8 0> <u8 1 if more parts follow, else 0> <part of the pickled state>
+
+On startup the log is replayed through a memory-mapped reader. A torn frame at
+the end (crash in the middle of a write) is detected by its length or crc and
+truncated away.
+
+fsync policies:
+    "always"   — fsync after every command; nothing acknowledged is ever lost.
+    "interval" — a background thread fsyncs every fsync_interval_ms milliseconds.
+    "os"       — never fsync; the OS flushes its page cache when it sees fit.
+Under every policy each frame reaches the OS with one write() call, so a crash
+of the process alone loses nothing.
+
+rewrite() compacts the log: a forked child writes the live state as a single
+snapshot frame while the parent keeps serving commands, buffering the frames
+appended meanwhile; once the child finishes the buffer is appended to the new
+file, which atomically replaces the old log. The fork happens under the log
+lock, so the interval syncer thread cannot be holding it in the child, and the
+child never touches the log itself.
+
+Snapshots are pickled. Loading a log unpickles its snapshot frames, which can
+run arbitrary code: only open logs written by a trusted process, in a
+directory nobody else can write to.
+"""
+import mmap
+import os
+import pickle
+import struct
+import threading
+import time
+import zlib
+from level4 import L4InMemoryDatabase
+
+HEADER = struct.Struct("<II")
+U32 = struct.Struct("<I")
+I64 = struct.Struct("<q")
+
+SNAPSHOT = 0
+SNAPSHOT_PART_SIZE = 1 << 28
+# opcode -> (database method, argument kinds: "s" string, "q" int, "p" field-value pairs)
+OPCODES = {
+    1: ("set", "sss"),
+    2: ("delete", "ss"),
+    3: ("mset", "sp"),
+    4: ("set_at", "sssq"),
+    5: ("set_at_with_ttl", "sssqq"),
+    6: ("mset_at", "spq"),
+    7: ("delete_at", "ssq"),
+    8: ("backup", "q"),
+    9: ("restore", "qq"),
+}
+METHOD_OPCODES = {method: opcode for opcode, (method, kinds) in OPCODES.items()}
+
+
+def _encode_string(out, value):
+    data = value.encode()
+    out += U32.pack(len(data))
+    out += data
+
+
+def encode_frame(opcode, args):
+    payload = bytearray((opcode,))
+    for kind, value in zip(OPCODES[opcode][1], args):
+        if kind == "s":
+            _encode_string(payload, value)
+        elif kind == "q":
+            payload += I64.pack(value)
+        else:
+            payload += U32.pack(len(value))
+            for field, item in value.items():
+                _encode_string(payload, field)
+                _encode_string(payload, item)
+    return HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def _decode_string(buffer, offset):
+    (length,) = U32.unpack_from(buffer, offset)
+    offset += 4
+    return str(buffer[offset:offset + length], "utf-8"), offset + length
+
+
+def decode_payload(payload):
+    """Return (opcode, args) of a frame payload; args of a snapshot frame is (more parts follow, part)."""
+    opcode = payload[0]
+    if opcode == SNAPSHOT:
+        return opcode, (payload[1] == 1, bytes(payload[2:]))
+    args = []
+    offset = 1
+    for kind in OPCODES[opcode][1]:
+        if kind == "s":
+            value, offset = _decode_string(payload, offset)
+        elif kind == "q":
+            (value,) = I64.unpack_from(payload, offset)
+            offset += 8
+        else:
+            (count,) = U32.unpack_from(payload, offset)
+            offset += 4
+            value = []
+            for _ in range(count):
+                field, offset = _decode_string(payload, offset)
+                item, offset = _decode_string(payload, offset)
+                value.append((field, item))
+        args.append(value)
+    return opcode, args
+
+
+def read_frames(path):
+    """Yield (opcode, args, end offset) for every intact frame of the log at path, read through mmap."""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        view = memoryview(mm)
+        try:
+            size, offset = len(mm), 0
+            while offset + HEADER.size <= size:
+                length, crc = HEADER.unpack_from(mm, offset)
+                end = offset + HEADER.size + length
+                if length == 0 or end > size:
+                    break
+                with view[offset + HEADER.size:end] as payload:
+                    if zlib.crc32(payload) != crc:
+                        break
+                    opcode, args = decode_payload(payload)
+                yield opcode, args, end
+                offset = end
+        finally:
+            view.release()
+
+
+def _fsync_directory(path):
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class CommandLog:
+    def __init__(self, path, fsync="interval", fsync_interval_ms=1000):
+        if fsync not in ("always", "interval", "os"):
+            raise ValueError(f"Unknown fsync policy: {fsync}")
+        self.path = path
+        self.fsync = fsync
+        self.fsync_interval_ms = fsync_interval_ms
+        self._file = None
+        self._lock = threading.Lock()
+        self._unsynced = False
+        self._rewrite_pid = None
+        self._rewrite_buffer = None
+        self._appends = 0
+        self._closed = threading.Event()
+        self._syncer = None
+
+    def open(self, offset):
+        """Open the log for appending, truncating whatever follows offset (a torn tail)."""
+        self._file = open(self.path, "ab", buffering=0)
+        if self._file.tell() != offset:
+            self._file.truncate(offset)
+        if self.fsync == "interval" and self._syncer is None:
+            self._syncer = threading.Thread(target=self._sync_periodically, daemon=True)
+            self._syncer.start()
+
+    def _sync_periodically(self):
+        while not self._closed.wait(self.fsync_interval_ms / 1000):
+            self.sync()
+
+    def sync(self):
+        with self._lock:
+            if self._unsynced and self._file is not None:
+                os.fsync(self._file.fileno())
+                self._unsynced = False
+
+    def append(self, opcode, args):
+        frame = encode_frame(opcode, args)
+        with self._lock:
+            self._file.write(frame)
+            if self.fsync == "always":
+                os.fsync(self._file.fileno())
+            else:
+                self._unsynced = True
+            if self._rewrite_buffer is not None:
+                self._rewrite_buffer += frame
+        if self._rewrite_pid is not None:
+            self._appends += 1
+            if self._appends % 256 == 0:
+                self.finish_rewrite(block=False)
+
+    def rewrite(self, state):
+        """Start compacting the log to a single snapshot frame of state. Returns False if a
+        rewrite is already running. Runs in a forked child where fork is available."""
+        if self._rewrite_pid is not None:
+            return False
+        temp_path = self.path + ".rewrite"
+        if not hasattr(os, "fork"):
+            self._write_snapshot(temp_path, state)
+            with self._lock:
+                self._install(temp_path, b"")
+            return True
+        # Holding the lock keeps the syncer thread out of it while forking: a child
+        # forked while another thread held it would inherit it held forever
+        with self._lock:
+            self._rewrite_buffer = bytearray()
+            pid = os.fork()
+        if pid == 0:
+            status = 1
+            try:
+                self._write_snapshot(temp_path, state)
+                status = 0
+            finally:
+                os._exit(status)
+        self._rewrite_pid = pid
+        return True
+
+    def _write_snapshot(self, temp_path, state):
+        data = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+        with open(temp_path, "wb") as f:
+            for start in range(0, len(data), SNAPSHOT_PART_SIZE):
+                more = start + SNAPSHOT_PART_SIZE < len(data)
+                payload = bytes((SNAPSHOT, more)) + data[start:start + SNAPSHOT_PART_SIZE]
+                f.write(HEADER.pack(len(payload), zlib.crc32(payload)))
+                f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def finish_rewrite(self, block=True):
+        """Install the rewritten log once its child is done. Returns True when no rewrite is pending."""
+        if self._rewrite_pid is None:
+            return True
+        pid, status = os.waitpid(self._rewrite_pid, 0 if block else os.WNOHANG)
+        if pid == 0:
+            return False
+        self._rewrite_pid = None
+        with self._lock:
+            buffered, self._rewrite_buffer = self._rewrite_buffer, None
+            if os.waitstatus_to_exitcode(status) == 0:
+                self._install(self.path + ".rewrite", buffered)
+            elif os.path.exists(self.path + ".rewrite"):
+                os.remove(self.path + ".rewrite")
+        return True
+
+    def _install(self, temp_path, buffered):
+        with open(temp_path, "ab") as f:
+            f.write(buffered)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+        _fsync_directory(self.path)
+        self._file.close()
+        self._file = open(self.path, "ab", buffering=0)
+        self._unsynced = False
+
+    def close(self):
+        self.finish_rewrite()
+        self._closed.set()
+        self.sync()
+        with self._lock:
+            self._file.close()
+            self._file = None
+
+
+class DurableInMemoryDatabase(L4InMemoryDatabase):
+    """L4InMemoryDatabase whose mutating commands are recorded in an append-only log at
+    path and replayed from it when the database is opened again. The log must come
+    from a trusted source: its snapshots are unpickled."""
+
+    # Attributes that are not part of the database state captured by rewrite()
+    _transient = ("log", "_log_depth", "scan_cache", "indexes")
+
+    def __init__(self, path, fsync="interval", fsync_interval_ms=1000, max_backups=None):
+        super().__init__(max_backups)
+        self.log = CommandLog(path, fsync, fsync_interval_ms)
+        # > 0 while executing a command, so commands called from within it are not logged twice
+        self._log_depth = 1
+        offset = 0
+        snapshot = []
+        for opcode, args, offset in read_frames(path):
+            if opcode == SNAPSHOT:
+                more, part = args
+                snapshot.append(part)
+                if not more:
+                    vars(self).update(pickle.loads(b"".join(snapshot)))
+                    snapshot = []
+            else:
+                getattr(self, OPCODES[opcode][0])(*args)
+        self._log_depth = 0
+        self.log.open(offset)
+
+    def _logged(self, method, *args):
+        self._log_depth += 1
+        try:
+            result = getattr(super(), method)(*args)
+        finally:
+            self._log_depth -= 1
+        if self._log_depth == 0:
+            self.log.append(METHOD_OPCODES[method], args)
+        return result
+
+    def set(self, key, field, value):
+        return self._logged("set", key, field, value)
+
+    def delete(self, key, field):
+        return self._logged("delete", key, field)
+
+    def mset(self, key, items):
+        return self._logged("mset", key, dict(items))
+
+    def set_at(self, key, field, value, timestamp):
+        return self._logged("set_at", key, field, value, timestamp)
+
+    def set_at_with_ttl(self, key, field, value, timestamp, ttl):
+        return self._logged("set_at_with_ttl", key, field, value, timestamp, ttl)
+
+    def mset_at(self, key, items, timestamp):
+        return self._logged("mset_at", key, dict(items), timestamp)
+
+    def delete_at(self, key, field, timestamp):
+        return self._logged("delete_at", key, field, timestamp)
+
+    def backup(self, timestamp):
+        return self._logged("backup", timestamp)
+
+    def restore(self, timestamp, timestamp_to_restore):
+        return self._logged("restore", timestamp, timestamp_to_restore)
+
+    def rewrite(self):
+        """Compact the log to the current state in the background."""
+        state = {name: value for name, value in vars(self).items() if name not in self._transient}
+        return self.log.rewrite(state)
+
+    def close(self):
+        self.log.close()
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    path = os.path.join(tempfile.mkdtemp(), "commands.log")
+    db = DurableInMemoryDatabase(path, fsync="always")
+    db.set_at_with_ttl("A", "B", "C", 1, 10)
+    db.backup(3)
+    db.set_at("A", "D", "E", 4)
+    db.rewrite()
+    db.delete_at("A", "B", 8)
+    db.close()
+
+    start = time.perf_counter()
+    db = DurableInMemoryDatabase(path)
+    print(f"Recovered in {1000 * (time.perf_counter() - start):.2f} ms:", db)
+    db.restore(10, 7)
+    print("After RESTORE 10 7:", db.scan_at("A", 15))
+    db.close()
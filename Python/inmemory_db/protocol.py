@@ -0,0 +1,130 @@
+"""
+Wire protocol shared by the database server and client (a subset of RESP).
+
+A request is an array of length-prefixed strings, the command and its arguments:
+    *<count>\r\n$<length>\r\n<utf-8 bytes>\r\n ...
+A reply is one of
+    $<length>\r\n<utf-8 bytes>\r\n   string
+    #t\r\n or #f\r\n                  boolean (DELETE)
+    *<count>\r\n<replies>            list of replies (MGET, MGET_AT)
+    -<message>\r\n                    error
+
+Both sides read whole chunks off the socket and parse every complete message in
+them at once, so a pipelined batch costs a few reads rather than one per message.
+"""
+
+
+class ProtocolError(Exception):
+    pass
+
+
+class ServerError(Exception):
+    pass
+
+
+def _bulk(value):
+    data = str(value).encode()
+    return b"$%d\r\n%s\r\n" % (len(data), data)
+
+
+def encode_request(query):
+    return b"*%d\r\n" % len(query) + b"".join(_bulk(token) for token in query)
+
+
+def encode_reply(result):
+    if isinstance(result, bool):
+        return b"#t\r\n" if result else b"#f\r\n"
+    if isinstance(result, (list, tuple)):
+        return b"*%d\r\n" % len(result) + b"".join(encode_reply(item) for item in result)
+    return _bulk(result)
+
+
+def encode_error(message):
+    return b"-" + " ".join(str(message).split()).encode() + b"\r\n"
+
+
+def _parse_line(buffer, pos, kinds):
+    """Return (kind, line content, position after the line), or None if the line is incomplete."""
+    end = buffer.find(b"\r\n", pos)
+    if end < 0:
+        return None
+    kind = buffer[pos:pos + 1]
+    if kind not in kinds:
+        raise ProtocolError(f"Unexpected message {bytes(buffer[pos:end + 2])!r}")
+    return kind, buffer[pos + 1:end], end + 2
+
+
+def _parse_bulk(buffer, pos, length):
+    end = pos + int(length)
+    if end + 2 > len(buffer):
+        return None
+    return buffer[pos:end].decode(), end + 2
+
+
+def parse_request(buffer, pos=0):
+    """Parse the request starting at pos; returns (query, end position) or None if incomplete."""
+    # The hot path of the server, so line and string parsing are inlined here
+    find, size = buffer.find, len(buffer)
+    end = find(b"\r\n", pos)
+    if end < 0:
+        return None
+    if buffer[pos] != ord("*"):
+        raise ProtocolError(f"Expected an array, got {bytes(buffer[pos:end + 2])!r}")
+    count = int(buffer[pos + 1:end])
+    pos = end + 2
+    query = []
+    for _ in range(count):
+        end = find(b"\r\n", pos)
+        if end < 0:
+            return None
+        if buffer[pos] != ord("$"):
+            raise ProtocolError(f"Expected a string, got {bytes(buffer[pos:end + 2])!r}")
+        start = end + 2
+        end = start + int(buffer[pos + 1:end])
+        if end + 2 > size:
+            return None
+        query.append(buffer[start:end].decode())
+        pos = end + 2
+    return query, pos
+
+
+def parse_reply(buffer, pos=0):
+    """Parse the reply starting at pos; returns (reply, end position) or None if incomplete.
+    Error replies are returned as ServerError instances."""
+    line = _parse_line(buffer, pos, (b"$", b"#", b"*", b"-"))
+    if line is None:
+        return None
+    kind, content, pos = line
+    if kind == b"$":
+        return _parse_bulk(buffer, pos, content)
+    if kind == b"#":
+        return content == b"t", pos
+    if kind == b"-":
+        return ServerError(content.decode()), pos
+    replies = []
+    for _ in range(int(content)):
+        reply = parse_reply(buffer, pos)
+        if reply is None:
+            return None
+        replies.append(reply[0])
+        pos = reply[1]
+    return replies, pos
+
+
+async def read_replies(reader, count):
+    """Read exactly count replies from reader."""
+    buffer = bytearray()
+    replies, pos = [], 0
+    while len(replies) < count:
+        reply = parse_reply(buffer, pos)
+        if reply is None:
+            chunk = await reader.read(1 << 16)
+            if not chunk:
+                raise ConnectionError("Connection closed by the server")
+            del buffer[:pos]
+            buffer += chunk
+            pos = 0
+            continue
+        replies.append(reply[0])
+        pos = reply[1]
+    return replies
@@ -0,0 +1,69 @@
+"""
+asyncio TCP server exposing the full command set of a database over the wire
+protocol of protocol.py.
+
+Requests on one connection are answered in order, so clients may pipeline: send
+many commands without waiting and then read all the replies. Commands of every
+connection run one at a time on the event loop, so the database needs no locking.
+
+Usage: python server.py [port]
+"""
+import asyncio
+from executor import CommandExecutor
+from level4 import L4InMemoryDatabase
+from protocol import ProtocolError, encode_error, encode_reply, parse_request
+
+
+class DatabaseServer:
+    def __init__(self, db=None, host="127.0.0.1", port=0):
+        self.db = L4InMemoryDatabase() if db is None else db
+        self.executor = CommandExecutor(self.db)
+        self.host = host
+        self.port = port
+        self.server = None
+
+    async def start(self):
+        """Start listening; returns the bound port (useful with port=0)."""
+        self.server = await asyncio.start_server(self._serve, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _serve(self, reader, writer):
+        execute_one = self.executor.execute_one
+        buffer = bytearray()
+        try:
+            while chunk := await reader.read(1 << 16):
+                buffer += chunk
+                # Execute every complete request received so far and answer them in one write
+                replies, pos = [], 0
+                while (request := parse_request(buffer, pos)) is not None:
+                    query, pos = request
+                    try:
+                        replies.append(encode_reply(execute_one(query)))
+                    except Exception as error:
+                        replies.append(encode_error(f"ERR {error}"))
+                del buffer[:pos]
+                writer.write(b"".join(replies))
+                await writer.drain()
+        except (ProtocolError, ValueError) as error:
+            writer.write(encode_error(f"ERR {error}"))
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+if __name__ == "__main__":
+    import sys
+
+    server = DatabaseServer(port=int(sys.argv[1]) if len(sys.argv) > 1 else 6380)
+    asyncio.run(server.serve_forever())
@@ -0,0 +1,116 @@
+"""
+Thread-safe in-memory database partitioned across shards with lock striping.
+
+Keys are spread over N shards by hash. Every shard is an independent database
+(L4InMemoryDatabase by default) with its own lock, TTL heap and backups, so
+threads working on keys of different shards never wait for each other.
+
+Consistency guarantees:
+- Every command on a key (SET/GET/DELETE/SCAN/SCAN_BY_PREFIX and their _AT and
+  bulk variants) runs entirely under the lock of the key's shard, so it is atomic
+  and SCAN returns a state of the record that existed at one instant: it never
+  mixes fields from before and after a concurrent write to the same key.
+- There is no atomicity across keys, except for BACKUP and RESTORE, which hold
+  the locks of all shards (acquired in shard order) and so snapshot or replace
+  the whole database at a single point in time.
+- Timestamps must still flow forward: concurrent writers should draw them from a
+  shared monotonic source.
+
+Striping removes lock contention between clients, but on a CPython build with the
+GIL only one thread executes Python code at a time, so `python sharded.py` shows
+flat throughput across shard counts there; it scales with shard count on
+free-threaded builds. To use all cores on GIL builds, see multiprocess.py.
+"""
+import threading
+from level4 import L4InMemoryDatabase
+
+
+def _keyed(method):
+    def command(self, key, *args):
+        i = hash(key) % len(self.shards)
+        with self.locks[i]:
+            return getattr(self.shards[i], method)(key, *args)
+    command.__name__ = method
+    return command
+
+
+class ShardedInMemoryDatabase:
+    def __init__(self, shards=16, shard_factory=L4InMemoryDatabase):
+        self.shards = [shard_factory() for _ in range(shards)]
+        self.locks = [threading.Lock() for _ in range(shards)]
+
+    set = _keyed("set")
+    get = _keyed("get")
+    delete = _keyed("delete")
+    mset = _keyed("mset")
+    mget = _keyed("mget")
+    scan = _keyed("scan")
+    scan_by_prefix = _keyed("scan_by_prefix")
+    set_at = _keyed("set_at")
+    set_at_with_ttl = _keyed("set_at_with_ttl")
+    mset_at = _keyed("mset_at")
+    get_at = _keyed("get_at")
+    mget_at = _keyed("mget_at")
+    delete_at = _keyed("delete_at")
+    scan_at = _keyed("scan_at")
+    scan_by_prefix_at = _keyed("scan_by_prefix_at")
+
+    def _lock_all(self):
+        for lock in self.locks:
+            lock.acquire()
+
+    def _unlock_all(self):
+        for lock in reversed(self.locks):
+            lock.release()
+
+    def backup(self, timestamp):
+        self._lock_all()
+        try:
+            return str(sum(int(shard.backup(timestamp)) for shard in self.shards))
+        finally:
+            self._unlock_all()
+
+    def restore(self, timestamp, timestamp_to_restore):
+        self._lock_all()
+        try:
+            for shard in self.shards:
+                shard.restore(timestamp, timestamp_to_restore)
+            return ""
+        finally:
+            self._unlock_all()
+
+
+def benchmark(shard_counts=(1, 2, 4, 8, 16), threads=8, ops_per_thread=20000, keys=1000):
+    """Ops/sec of a thread pool running a mixed SET_AT/GET_AT/SCAN_AT workload for each shard count."""
+    import itertools
+    import random
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+
+    results = {}
+    for shard_count in shard_counts:
+        db = ShardedInMemoryDatabase(shard_count)
+        clock = itertools.count(1)
+
+        def client(seed):
+            rnd = random.Random(seed)
+            for _ in range(ops_per_thread):
+                key, field = f"key{rnd.randrange(keys)}", f"field{rnd.randrange(16)}"
+                op = rnd.random()
+                if op < 0.5:
+                    db.set_at_with_ttl(key, field, "value", next(clock), 1000)
+                elif op < 0.9:
+                    db.get_at(key, field, next(clock))
+                else:
+                    db.scan_at(key, next(clock))
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(threads) as pool:
+            list(pool.map(client, range(threads)))
+        results[shard_count] = threads * ops_per_thread / (time.perf_counter() - start)
+    return results
+
+
+if __name__ == "__main__":
+    for shard_count, ops in benchmark().items():
+        print(f"shards={shard_count:<3} {ops:>12,.0f} ops/sec")
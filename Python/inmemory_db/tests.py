@@ -0,0 +1,542 @@
+import asyncio
+import io
+import os
+import pickle
+import tempfile
+import threading
+import unittest
+from benchmark import generate_workload, run_level
+from client import Client
+from compact import CompactInMemoryDatabase
+from executor import CommandExecutor
+from indexes import SecondaryIndexes
+from instrumentation import Instrumentation, LatencyHistogram
+from level2 import L2InMemoryDatabase
+from level3 import L3InMemoryDatabase
+from level4 import L4InMemoryDatabase
+from multiprocess import MultiProcessDatabase
+from mvcc import MVCCInMemoryDatabase
+from persistence import DurableInMemoryDatabase
+from protocol import ServerError
+from scan_cache import ScanCache
+from server import DatabaseServer
+from tiered import TieredInMemoryDatabase
+from sharded import ShardedInMemoryDatabase
+
+
+class ScanTest(unittest.TestCase):
+    def test1(self):
+        db = L2InMemoryDatabase()
+        for field, value in [("BD", "F"), ("C", "G"), ("BC", "E"), ("B", "H")]:
+            db.set("A", field, value)
+        self.assertEqual(db.scan("A"), "B(H), BC(E), BD(F), C(G)")
+        self.assertEqual(db.scan_by_prefix("A", "B"), "B(H), BC(E), BD(F)")
+        self.assertEqual(db.scan_by_prefix("A", "BC"), "BC(E)")
+        self.assertEqual(db.scan_by_prefix("B", "B"), "")
+
+    def test2(self):
+        db = L2InMemoryDatabase()
+        db.set("A", "BC", "E")
+        db.set("A", "BC", "F")
+        db.delete("A", "BC")
+        self.assertEqual(db.scan("A"), "")
+        self.assertEqual(db.field_index, {})
+
+    def test3(self):
+        db = L3InMemoryDatabase()
+        db.set_at_with_ttl("A", "BC", "E", 1, 9)
+        db.set_at_with_ttl("A", "BC", "E", 5, 10)
+        db.set_at("A", "BD", "F", 5)
+        self.assertEqual(db.scan_by_prefix_at("A", "B", 14), "BC(E), BD(F)")
+        self.assertEqual(db.scan_by_prefix_at("A", "B", 15), "BD(F)")
+        self.assertEqual(db.field_index, {"A": ["BD"]})
+
+
+class ExpiryTest(unittest.TestCase):
+    def test1(self):
+        db = L3InMemoryDatabase()
+        db.set_at("A", "B", "C", 1)
+        db.set_at_with_ttl("X", "Y", "Z", 2, 15)
+        db.set_at_with_ttl("A", "D", "E", 4, 10)
+        self.assertEqual(db.get_at("X", "Y", 14), "Z")
+        # Expired fields of every record are evicted, not only those of the queried key
+        self.assertEqual(db.database, {"A": {"B": ("C", 1)}, "X": {"Y": ("Z", 2)}})
+        self.assertEqual(db.ttl_data, {"X": {"Y": 17}})
+
+    def test2(self):
+        db = L3InMemoryDatabase()
+        db.set_at_with_ttl("A", "B", "C", 1, 5)
+        db.set_at_with_ttl("A", "B", "D", 2, 10)
+        self.assertEqual(db.get_at("A", "B", 7), "D")
+        self.assertEqual(db.delete_at("A", "B", 8), "true")
+        self.assertEqual(db.get_at("A", "B", 9), "")
+        self.assertEqual(db.ttl_data, {})
+
+    def test3(self):
+        db = L4InMemoryDatabase()
+        db.set_at_with_ttl("A", "B", "C", 1, 2)
+        db.set_at("D", "E", "F", 2)
+        self.assertEqual(db.backup(3), "1")
+
+
+class BackupTest(unittest.TestCase):
+    def test1(self):
+        db = L4InMemoryDatabase()
+        db.set_at_with_ttl("A", "B", "C", 1, 10)
+        db.backup(3)
+        db.set_at("A", "D", "E", 4)
+        db.backup(5)
+        db.delete_at("A", "B", 8)
+        db.backup(9)
+        db.restore(10, 7)
+        self.assertEqual(db.scan_at("A", 15), "B(C), D(E)")
+        self.assertEqual(db.scan_at("A", 16), "D(E)")
+
+    def test2(self):
+        db = L4InMemoryDatabase()
+        db.set_at("A", "B", "C", 1)
+        db.set_at("X", "Y", "Z", 2)
+        db.backup(3)
+        db.set_at("A", "B", "D", 4)
+        db.backup(5)
+        # The untouched record is shared by both backups instead of being copied
+        self.assertIs(db.versions["X"][1][0][0], db.database["X"])
+        self.assertEqual(db.versions["X"][0], [3])
+        self.assertEqual(db.versions["A"][0], [3, 5])
+        db.restore(6, 4)
+        self.assertEqual(db.get_at("A", "B", 7), "C")
+
+    def test3(self):
+        db = L4InMemoryDatabase(max_backups=2)
+        for t in range(1, 10):
+            db.set_at("A", "B", str(t), 2 * t)
+            db.backup(2 * t + 1)
+        self.assertEqual(db.backups, [17, 19])
+        self.assertEqual(db.versions["A"][0], [17, 19])
+        db.restore(20, 18)
+        self.assertEqual(db.get_at("A", "B", 21), "8")
+        self.assertRaises(ValueError, db.restore, 22, 16)
+
+
+class ExecutorTest(unittest.TestCase):
+    def test1(self):
+        executor = CommandExecutor(L4InMemoryDatabase())
+        queries = [
+            ["SET_AT_WITH_TTL", "A", "B", "C", "1", "10"],
+            ["BACKUP", "3"],
+            ["SET_AT", "A", "D", "E", "4"],
+            ["BACKUP", "5"],
+            ["DELETE_AT", "A", "B", "8"],
+            ["BACKUP", "9"],
+            ["RESTORE", "10", "7"],
+            ["BACKUP", "11"],
+            ["SCAN_AT", "A", "15"],
+            ["SCAN_AT", "A", "16"]]
+        expected = ["", "1", "", "1", "true", "1", "", "1", "B(C), D(E)", "D(E)"]
+        self.assertEqual(executor.execute(queries), expected)
+
+    def test2(self):
+        executor = CommandExecutor(L2InMemoryDatabase(), batch_size=2)
+        stream = io.StringIO("SET A BC E\nSET A BD F\n\nSET A C G\nSCAN_BY_PREFIX A B\nSCAN A\n")
+        self.assertEqual(executor.execute(stream), ["", "", "", "BC(E), BD(F)", "BC(E), BD(F), C(G)"])
+        self.assertRaises(ValueError, executor.execute, [["SET_AT", "A", "B", "C", "1"]])
+        self.assertRaises(ValueError, executor.execute, [["MSET", "A", "B", "C", "D"]])
+        self.assertEqual(executor.execute([["MSET", "A", "B", "C", "D", "E"], ["SCAN", "A"]])[1],
+                         "B(C), BC(E), BD(F), C(G), D(E)")
+        executor = CommandExecutor(L4InMemoryDatabase())
+        self.assertRaises(ValueError, executor.execute, [["MSET_AT", "A", "B", "C", "D", "1"]])
+        self.assertEqual(executor.execute([["MSET_AT", "A", "B", "C", "1"], ["GET_AT", "A", "B", "2"]]), ["", "C"])
+
+    def test3(self):
+        db = L4InMemoryDatabase()
+        executor = CommandExecutor(db)
+        fields = [f"F{i}" for i in range(20, 0, -1)]
+        executor.execute_one(["MSET_AT", "A", "F3", "X", "1"])
+        executor.execute_one(["MSET_AT", "A"] + [token for field in fields for token in (field, field.lower())] + ["2"])
+        self.assertEqual(db.field_index["A"], sorted(fields))
+        self.assertEqual(executor.execute_one(["MGET_AT", "A", "F3", "F7", "G", "3"]), ["f3", "f7", ""])
+        self.assertEqual(executor.execute_many("GET_AT", [("A", "F1", "4"), ("B", "F1", "5")]), ["f1", ""])
+
+    def test4(self):
+        db = L2InMemoryDatabase()
+        db.mset("A", {"C": "1", "B": "2"})
+        self.assertEqual(db.mget("A", ["B", "D"]), ["2", ""])
+        self.assertEqual(db.scan("A"), "B(2), C(1)")
+
+
+class DurableTest(unittest.TestCase):
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), "commands.log")
+
+    def test1(self):
+        db = DurableInMemoryDatabase(self.path, fsync="always")
+        db.set_at_with_ttl("A", "B", "C", 1, 10)
+        db.backup(3)
+        db.mset_at("A", {"D": "E", "F": "G"}, 4)
+        db.close()
+        db = DurableInMemoryDatabase(self.path, fsync="os")
+        self.assertEqual(db.scan_at("A", 5), "B(C), D(E), F(G)")
+        db.restore(6, 3)
+        db.close()
+        db = DurableInMemoryDatabase(self.path)
+        self.assertEqual(db.scan_at("A", 13), "B(C)")
+        self.assertEqual(db.scan_at("A", 14), "")
+        db.close()
+
+    def test2(self):
+        db = DurableInMemoryDatabase(self.path, fsync="os")
+        db.set_at("A", "B", "C", 1)
+        db.close()
+        # A frame torn by a crash in the middle of a write is dropped on recovery
+        with open(self.path, "ab") as f:
+            f.write(b"\x20\x00\x00\x00\x00")
+        db = DurableInMemoryDatabase(self.path, fsync="os")
+        db.set_at("A", "D", "E", 2)
+        db.close()
+        db = DurableInMemoryDatabase(self.path, fsync="os")
+        self.assertEqual(db.scan_at("A", 3), "B(C), D(E)")
+        db.close()
+
+    def test3(self):
+        db = DurableInMemoryDatabase(self.path, fsync="os")
+        for t in range(1, 100):
+            db.set_at("A", "B", str(t), t)
+        size = os.path.getsize(self.path)
+        db.rewrite()
+        db.set_at("A", "C", "D", 100)
+        db.log.finish_rewrite()
+        self.assertLess(os.path.getsize(self.path), size)
+        db.close()
+        db = DurableInMemoryDatabase(self.path, fsync="os")
+        self.assertEqual(db.scan_at("A", 101), "B(99), C(D)")
+        db.close()
+
+    def test4(self):
+        # The syncer thread fsyncs constantly while rewrites fork
+        db = DurableInMemoryDatabase(self.path, fsync="interval", fsync_interval_ms=0)
+        for t in range(1, 200):
+            db.set_at("A", "B", str(t), t)
+            if t % 50 == 0:
+                db.rewrite()
+                db.log.finish_rewrite()
+        db.close()
+        db = DurableInMemoryDatabase(self.path, fsync="os")
+        self.assertEqual(db.scan_at("A", 200), "B(199)")
+        db.close()
+
+
+class ShardedTest(unittest.TestCase):
+    def test1(self):
+        db = ShardedInMemoryDatabase(shards=4)
+        db.set_at_with_ttl("A", "B", "C", 1, 10)
+        db.set_at("X", "Y", "Z", 2)
+        self.assertEqual(db.backup(3), "2")
+        db.delete_at("X", "Y", 4)
+        db.restore(5, 3)
+        self.assertEqual(db.scan_at("X", 6), "Y(Z)")
+        self.assertEqual(db.get_at("A", "B", 12), "C")
+        self.assertEqual(db.get_at("A", "B", 13), "")
+
+    def test2(self):
+        db = ShardedInMemoryDatabase(shards=4)
+
+        def client(n):
+            for i in range(2000):
+                db.set(f"K{i % 7}", f"F{n}", str(i))
+                db.delete(f"K{i % 7}", f"F{n}")
+            db.set("K0", f"F{n}", "done")
+
+        threads = [threading.Thread(target=client, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(db.scan("K0"), "F0(done), F1(done), F2(done), F3(done)")
+        self.assertEqual(db.scan("K1"), "")
+
+
+class ServerTest(unittest.TestCase):
+    def test1(self):
+        async def scenario():
+            server = DatabaseServer()
+            client = Client(port=await server.start(), pool_size=2)
+            try:
+                replies = await client.pipeline([
+                    ["SET_AT_WITH_TTL", "A", "B", "C", 1, 10],
+                    ["BACKUP", 3],
+                    ["MSET_AT", "A", "D", "E", "F", "G H", 4],
+                    ["MGET_AT", "A", "B", "F", "X", 5],
+                    ["RESTORE", 6, 3],
+                    ["SCAN_AT", "A", 7]])
+                self.assertEqual(replies, ["", "1", "", ["C", "G H", ""], "", "B(C)"])
+                results = await asyncio.gather(*(client.execute("GET_AT", "A", "B", t) for t in range(8, 20)))
+                self.assertEqual(results, ["C"] * 6 + [""] * 6)
+                with self.assertRaises(ServerError):
+                    await client.pipeline([["SET_AT", "A", "B", "C", 21], ["NOPE"]])
+                self.assertEqual(await client.execute("GET_AT", "A", "B", 22), "C")
+            finally:
+                await client.close()
+                await server.close()
+
+        asyncio.run(scenario())
+
+
+class CompactTest(unittest.TestCase):
+    def test1(self):
+        db = CompactInMemoryDatabase()
+        db.set_at_with_ttl("A", "B", "C", 1, 10)
+        db.backup(3)
+        db.set_at("A", "D", "E", 4)
+        db.backup(5)
+        db.delete_at("A", "B", 8)
+        db.backup(9)
+        db.restore(10, 7)
+        db.backup(11)
+        self.assertEqual(db.scan_at("A", 15), "B(C), D(E)")
+        self.assertEqual(db.scan_at("A", 16), "D(E)")
+        self.assertEqual(db.ttl_data, {})
+
+    def test2(self):
+        db = CompactInMemoryDatabase()
+        db.mset_at("A", {"X": "1", "Y": "2", "Z": "3"}, 1)
+        db.set_at_with_ttl("A", "X", "4", 2, 5)
+        db.delete_at("A", "Y", 3)
+        record = db.database["A"]
+        self.assertEqual(dict(record.items()), {"X": ("4", 2), "Z": ("3", 1)})
+        self.assertEqual(list(record.ttl_items()), [("X", 7)])
+        self.assertEqual(db.mget_at("A", ["X", "Y", "Z"], 6), ["4", "", "3"])
+        self.assertEqual(db.scan_at("A", 7), "Z(3)")
+        self.assertEqual(record.ttl_count, 0)
+
+
+class BenchmarkTest(unittest.TestCase):
+    def test1(self):
+        workload = dict(operations=500, records=20, fields=4, backup_every=50, restore_every=200, seed=3)
+        self.assertEqual(generate_workload("L4", **workload), generate_workload("L4", **workload))
+        load, run = generate_workload("L4", **workload)
+        self.assertEqual(len(load), 80)
+        self.assertEqual(sum(query[0] == "BACKUP" for query in run), 8)
+        self.assertEqual(sum(query[0] == "RESTORE" for query in run), 2)
+
+    def test2(self):
+        result = run_level("L2", operations=300, records=10, fields=4)
+        self.assertEqual(result["operations"], 300)
+        self.assertEqual(set(result["commands"]), {"GET", "SET", "SCAN_BY_PREFIX"})
+        self.assertLessEqual(result["commands"]["GET"]["p50_us"], result["commands"]["GET"]["p999_us"])
+
+
+class InstrumentationTest(unittest.TestCase):
+    def test1(self):
+        histogram = LatencyHistogram()
+        for value in range(1, 100001):
+            histogram.record(value)
+        for q in (0.5, 0.99, 0.999):
+            self.assertAlmostEqual(histogram.percentile(q), q * 100000, delta=q * 100000 * 0.016)
+        self.assertEqual(histogram.percentile(1), 100000)
+
+    def test2(self):
+        db = L4InMemoryDatabase()
+        stats = Instrumentation(db)
+        stats.enable()
+        calls = []
+        stats.add_listener(lambda command, elapsed, result: calls.append(command))
+        executor = CommandExecutor(db)
+        executor.execute([["SET_AT_WITH_TTL", "A", "B", "C", 1, 5], ["SET_AT", "A", "BD", "E", 2],
+                          ["SET_AT", "F", "G", "H", 3], ["BACKUP", 4], ["SCAN_BY_PREFIX_AT", "A", "B", 5],
+                          ["SCAN_AT", "A", 6], ["SCAN_AT", "Z", 6], ["BACKUP", 7]])
+        self.assertEqual(calls, ["SET_AT_WITH_TTL", "SET_AT", "SET_AT", "BACKUP", "SCAN_BY_PREFIX_AT",
+                                 "SCAN_AT", "SCAN_AT", "BACKUP"])
+        result = stats.stats()
+        self.assertEqual(result["commands"]["SET_AT"]["count"], 2)
+        self.assertEqual(result["evicted_fields"], 1)
+        self.assertEqual(result["scan_result_fields"]["SCAN_BY_PREFIX_AT"]["max"], 2)
+        self.assertEqual(result["scan_result_fields"]["SCAN_AT"]["count"], 2)
+        self.assertEqual(result["scan_result_fields"]["SCAN_AT"]["min"], 0)
+        self.assertEqual(result["scan_result_fields"]["SCAN_AT"]["max"], 1)
+        self.assertEqual(result["snapshot_records"]["count"], 2)
+        self.assertEqual(result["snapshot_records"]["max"], 2)
+        self.assertIn("cmdstat_backup:calls=2", executor.execute_one(["INFO"]))
+
+        stats.disable()
+        self.assertNotIn("set_at", vars(db))
+        self.assertFalse(hasattr(db, "info"))
+        db.set_at("A", "X", "Y", 8)
+        self.assertEqual(stats.stats()["commands"]["SET_AT"]["count"], 2)
+
+
+class ScanCacheTest(unittest.TestCase):
+    def test1(self):
+        db = L4InMemoryDatabase()
+        db.scan_cache = ScanCache()
+        db.mset_at("A", {"BC": "1", "BD": "2", "C": "3"}, 1)
+        db.set_at("X", "Y", "Z", 1)
+        self.assertEqual(db.scan_by_prefix_at("A", "B", 2), "BC(1), BD(2)")
+        self.assertEqual(db.scan_by_prefix_at("A", "B", 3), "BC(1), BD(2)")
+        self.assertEqual(db.scan_at("X", 3), "Y(Z)")
+        self.assertEqual((db.scan_cache.hits, db.scan_cache.misses), (1, 2))
+
+        db.set_at_with_ttl("A", "BE", "4", 4, 2)
+        self.assertEqual(db.scan_cache.invalidations, 1)
+        self.assertEqual(db.scan_by_prefix_at("A", "B", 5), "BC(1), BD(2), BE(4)")
+        self.assertEqual(db.scan_by_prefix_at("A", "B", 6), "BC(1), BD(2)")
+        db.backup(7)
+        db.delete_at("A", "BC", 8)
+        self.assertEqual(db.scan_by_prefix_at("A", "B", 9), "BD(2)")
+        db.restore(10, 7)
+        self.assertEqual(db.scan_by_prefix_at("A", "B", 11), "BC(1), BD(2)")
+        self.assertEqual(db.scan_at("X", 12), "Y(Z)")
+        self.assertEqual(db.scan_cache.hits, 1)
+
+    def test2(self):
+        cache = ScanCache(max_entries=2)
+        cache.put("A", "", "a")
+        cache.put("A", "B", "b")
+        cache.get("A", "")
+        cache.put("C", "", "c")
+        self.assertEqual(list(cache.entries), [("A", ""), ("C", "")])
+        self.assertEqual(cache.stats()["evictions"], 1)
+        cache.invalidate("A")
+        self.assertEqual(cache.prefixes, {"C": {""}})
+
+
+class MVCCTest(unittest.TestCase):
+    def test1(self):
+        db = MVCCInMemoryDatabase()
+        executor = CommandExecutor(db)
+        executor.execute([["SET_AT", "A", "B", "C", 1], ["SET_AT_WITH_TTL", "A", "D", "E", 2, 5], ["BACKUP", 3],
+                          ["SET_AT", "A", "B", "F", 4], ["DELETE_AT", "A", "D", 5], ["RESTORE", 8, 3]])
+        self.assertEqual(executor.execute([["SCAN_AS_OF", "A", t] for t in (0, 1, 3, 5, 8)]),
+                         ["", "B(C)", "B(C), D(E)", "B(F)", "B(C), D(E)"])
+        # D was restored with 4 of its 5 ttl left
+        self.assertEqual(executor.execute([["GET_AS_OF", "A", "D", t] for t in (6, 11, 12)]), ["", "E", ""])
+        self.assertEqual(db.scan_by_prefix_as_of("A", "D", 4), "D(E)")
+        self.assertEqual(db.scan_at("A", 9), "B(C), D(E)")
+
+    def test2(self):
+        db = MVCCInMemoryDatabase(horizon=10)
+        for t in range(1, 50):
+            db.set_at("A", "B", str(t), t)
+        db.set_at_with_ttl("A", "C", "D", 50, 2)
+        db.delete_at("A", "B", 51)
+        self.assertEqual(db.get_as_of("A", "B", 41), "41")
+        self.assertEqual(db.scan_as_of("A", 51), "C(D)")
+        self.assertLessEqual(len(db.history["A"][1]["B"][0]), 12)
+        self.assertRaises(ValueError, db.get_as_of, "A", "B", 40)
+        db.set_at("X", "Y", "Z", 70)
+        self.assertEqual(list(db.history), ["X"])
+
+
+class MultiProcessTest(unittest.TestCase):
+    def test1(self):
+        load, run = generate_workload("L4", operations=2000, records=50, fields=4, backup_every=300,
+                                      restore_every=700, seed=5)
+        expected = CommandExecutor(L4InMemoryDatabase()).execute(load + run)
+        with MultiProcessDatabase(workers=3, batch_size=500) as db:
+            self.assertEqual(db.execute(load + run), expected)
+            self.assertEqual(len({db.shard_of(f"user{i}") for i in range(50)}), 3)
+
+    def test2(self):
+        with MultiProcessDatabase(workers=2) as db:
+            db.mset_at("A", {"B": "1", "C": "2"}, 1)
+            self.assertEqual(db.backup(2), "1")
+            db.set_at_with_ttl("D", "E", "F", 3, 5)
+            self.assertEqual(db.mget_at("A", ["B", "X"], 4), ["1", ""])
+            self.assertEqual(db.backup(5), "2")
+            self.assertEqual(db.restore(6, 2), "")
+            self.assertEqual(db.scan_at("D", 7), "")
+            with self.assertRaises(ValueError):
+                db.execute([["SET_AT", "X", "Y", "Z", 8], ["NOPE", "X"]])
+            self.assertEqual(db.get_at("X", "Y", 9), "Z")
+
+
+class TieredTest(unittest.TestCase):
+    def test1(self):
+        load, run = generate_workload("L4", operations=3000, records=40, fields=4, backup_every=200,
+                                      restore_every=900, ttl_range=(10, 500), seed=7)
+        expected = CommandExecutor(L4InMemoryDatabase()).execute(load + run)
+        db = TieredInMemoryDatabase(resident_records=5)
+        self.assertEqual(CommandExecutor(db).execute(load + run), expected)
+        self.assertLessEqual(len(db.database), 5)
+        self.assertGreater(db._spilled_records, 0)
+        db.close()
+
+    def test2(self):
+        db = TieredInMemoryDatabase(resident_records=2)
+        for key in "ABCD":
+            db.set_at(key, "F", key.lower(), ord(key))
+        db.get_at("C", "F", 70)
+        db.set_at("E", "F", "e", 71)
+        self.assertEqual(set(db.database), {"C", "E"})
+        self.assertEqual(db.scan_at("A", 72), "F(a)")
+        self.assertEqual(db.backup(73), "5")
+        db.close()
+        self.assertFalse(os.path.exists(db.path))
+
+    def test3(self):
+        db = TieredInMemoryDatabase(resident_records=2)
+        db.set_at("A", "F", "a", 1)
+        db.set("B", "F", "b")
+        for i in range(10):
+            self.assertEqual(db.get_at(f"missing{i}", "F", 2), "")
+            self.assertEqual(db.scan(f"missing{i}"), "")
+            self.assertEqual(db.delete_at(f"missing{i}", "F", 2), "false")
+        self.assertEqual(set(db.database), {"A", "B"})
+        self.assertEqual(db._spilled, {})
+        db.close()
+
+    def test4(self):
+        db = TieredInMemoryDatabase(resident_records=1)
+        db.indexes = SecondaryIndexes(db.database, fields=["country"])
+        for i, key in enumerate(["user1", "user2", "user3"]):
+            db.set_at(key, "country", "NL", i + 1)
+        self.assertEqual(set(db._spilled), {"user1", "user2"})
+        self.assertEqual(db.find_at("country", "NL", 4), "user1, user2, user3")
+        db.backup(5)
+        db.set_at("user1", "country", "DE", 6)
+        db.set_at("user3", "country", "DE", 7)
+        self.assertEqual(db.find_at("country", "DE", 8), "user1, user3")
+        db.restore(9, 5)
+        self.assertTrue(db._spilled)
+        self.assertEqual(db.find_at("country", "NL", 10), "user1, user2, user3")
+        self.assertEqual(db.keys_in_range_at("user1", "user3", 10), "user1, user2")
+        self.assertEqual(db.get_at("user1", "country", 11), "NL")
+        self.assertEqual(db.find_at("country", "DE", 12), "")
+        db.close()
+
+    def test5(self):
+        db = TieredInMemoryDatabase(resident_records=1, max_backups=2)
+        for t in (1, 3):
+            db.set_at("A", "x", str(t), t)
+            db.backup(t + 1)
+        db.set_at("B", "x", "5", 5)
+        db.backup(6)
+        self.assertEqual(set(db._spilled), {"A"})
+        db.compact()
+        (data,) = db.store.execute("SELECT data FROM spilled WHERE key = 'A'").fetchone()
+        self.assertEqual(pickle.loads(data)[1][0], [4])
+        db.restore(7, 4)
+        self.assertEqual(db.get_at("A", "x", 8), "3")
+        db.close()
+
+
+class IndexesTest(unittest.TestCase):
+    def test1(self):
+        db = L4InMemoryDatabase()
+        db.mset_at("user1", {"country": "NL", "name": "A"}, 1)
+        db.indexes = SecondaryIndexes(db.database, fields=["country"])
+        executor = CommandExecutor(db)
+        executor.execute([["SET_AT", "user2", "country", "NL", 2], ["SET_AT_WITH_TTL", "user3", "country", "DE", 3, 5],
+                          ["SET_AT", "admin", "country", "NL", 4], ["BACKUP", 5], ["DELETE_AT", "user1", "country", 6]])
+        self.assertEqual(executor.execute_one(["FIND_AT", "country", "NL", 7]), "admin, user2")
+        self.assertEqual(db.find_at("country", "DE", 7), "user3")
+        self.assertEqual(db.keys_by_prefix_at("user", 7), "user1, user2, user3")
+        self.assertEqual(db.find_at("country", "DE", 8), "")
+        self.assertEqual(db.keys_in_range_at("b", "user3", 8), "user1, user2")
+        db.restore(9, 5)
+        self.assertEqual(db.find_at("country", "NL", 10), "admin, user1, user2")
+        self.assertEqual(db.find_at("country", "DE", 10), "user3")
+        self.assertRaises(ValueError, db.find_at, "name", "A", 11)
+
+
+if __name__ == '__main__':
+    unittest.main()
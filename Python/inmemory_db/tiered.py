@@ -0,0 +1,243 @@
+"""
+L4InMemoryDatabase that keeps at most a budget of records in memory and spills
+the rest to an on-disk store (sqlite3).
+
+    db = TieredInMemoryDatabase(resident_records=100000, path="cold.sqlite")
+
+A key is spilled as a unit: its record together with its backup version
+chain, so old backups of cold records leave memory with them. The key to spill
+is chosen by CLOCK (second chance): every access to a resident key sets its
+reference bit, and the hand sweeping the resident keys in insertion order
+spills the first key whose bit is clear, clearing the bits it passes over.
+
+Any command that reads or changes a spilled key first faults it back in, so
+every command returns exactly what L4InMemoryDatabase returns. Reads of keys
+stored nowhere leave the CLOCK alone. BACKUP briefly faults in the spilled
+records changed since the previous backup to version them, RESTORE rebuilds
+spilled records one at a time, straight back to disk, and compact() prunes
+spilled version chains in the store.
+
+The budget bounds records and version chains, not TTLs: the TTLs of spilled
+keys (and the expiry heap) stay in memory, so expiry never reads the disk until
+it has a field to evict. A workload with many TTL'd cold fields keeps O(TTL'd
+fields) in memory.
+
+SecondaryIndexes (indexes.py) cover spilled records too: spilling keeps their
+index entries, and records changed since the last query are re-indexed from
+wherever they are, reading spilled ones from the store without faulting them in.
+
+With path None the store is a temporary file removed by close().
+"""
+import os
+import pickle
+import sqlite3
+import tempfile
+from bisect import bisect_right
+from collections import OrderedDict
+from level4 import L4InMemoryDatabase
+
+
+def _faulting(name, writes=False):
+    method = getattr(L4InMemoryDatabase, name)
+
+    def command(self, key, *args):
+        self._load(key, admit=writes)
+        # Faulting in other keys while the command runs (to expire their fields) must not spill key
+        self._pinned = key
+        try:
+            return method(self, key, *args)
+        finally:
+            self._pinned = None
+    command.__name__ = name
+    return command
+
+
+class _Records:
+    """The records of a tiered database, resident or spilled, as SecondaryIndexes.refresh reads them."""
+
+    def __init__(self, database):
+        self.database = database
+
+    def get(self, key):
+        return self.database._stored_record(key)
+
+
+class TieredInMemoryDatabase(L4InMemoryDatabase):
+    def __init__(self, resident_records=100000, path=None, max_backups=None):
+        super().__init__(max_backups)
+        self.resident_records = resident_records
+        self._temporary = path is None
+        if path is None:
+            descriptor, path = tempfile.mkstemp(suffix=".sqlite")
+            os.close(descriptor)
+        self.path = path
+        self.store = sqlite3.connect(path)
+        self.store.executescript("""
+            PRAGMA journal_mode = OFF;
+            PRAGMA synchronous = OFF;
+            DROP TABLE IF EXISTS spilled;
+            CREATE TABLE spilled (key TEXT PRIMARY KEY, data BLOB);
+        """)
+        # Resident keys in CLOCK order -> reference bit
+        self._clock = OrderedDict()
+        # Spilled keys -> whether they have a live record
+        self._spilled = {}
+        self._spilled_records = 0
+        self._pinned = None
+
+    def close(self):
+        self.store.close()
+        if self._temporary:
+            os.remove(self.path)
+
+    def _load(self, key, enforce=True, admit=False):
+        """Fault key in if it is spilled and mark it referenced. A key stored nowhere only
+        becomes resident when it is about to be written (admit), so misses never spill records."""
+        clock = self._clock
+        if key in clock:
+            clock[key] = True
+            return
+        if not admit and key not in self._spilled:
+            return
+        # A key earns its second chance by being referenced again while resident
+        clock[key] = False
+        if key in self._spilled:
+            if self._spilled.pop(key):
+                self._spilled_records -= 1
+            (data,) = self.store.execute("SELECT data FROM spilled WHERE key = ?", (key,)).fetchone()
+            self.store.execute("DELETE FROM spilled WHERE key = ?", (key,))
+            record, chain = pickle.loads(data)
+            if record is not None:
+                self.database[key] = record
+                self.field_index[key] = sorted(record)
+            if chain is not None:
+                self.versions[key] = chain
+        if enforce:
+            self._enforce_budget(key)
+
+    def _stored_record(self, key):
+        """The record of key, read from the store without faulting it in if it is spilled."""
+        if key not in self._spilled:
+            return self.database.get(key)
+        (data,) = self.store.execute("SELECT data FROM spilled WHERE key = ?", (key,)).fetchone()
+        return pickle.loads(data)[0]
+
+    def _spill(self, key):
+        record = self.database.pop(key, None)
+        chain = self.versions.pop(key, None)
+        self.field_index.pop(key, None)
+        if record is None and chain is None:
+            return
+        self.store.execute("INSERT OR REPLACE INTO spilled VALUES (?, ?)",
+                           (key, pickle.dumps((record, chain), pickle.HIGHEST_PROTOCOL)))
+        self._spilled[key] = record is not None
+        self._spilled_records += record is not None
+
+    def _enforce_budget(self, protected=None):
+        """Spill keys chosen by CLOCK until the budget is met, never spilling the key being
+        faulted in (protected) or the key of the running command."""
+        clock = self._clock
+        skipped = 0
+        while len(clock) > self.resident_records and skipped < len(clock):
+            key, referenced = clock.popitem(last=False)
+            if key == protected or key == self._pinned:
+                clock[key] = referenced
+                skipped += 1
+            elif referenced:
+                clock[key] = False
+                skipped = 0
+            else:
+                self._spill(key)
+                skipped = 0
+
+    def _touch(self, key):
+        self._load(key, admit=True)
+        super()._touch(key)
+
+    def _indexes_at(self, timestamp):
+        # Spilled records keep their index entries; changed ones are re-indexed from the store
+        self._clean_expired(timestamp)
+        if self.indexes is None:
+            raise ValueError("No secondary indexes on this database")
+        self.indexes.refresh(_Records(self))
+        return self.indexes
+
+    set = _faulting("set", writes=True)
+    get = _faulting("get")
+    delete = _faulting("delete")
+    mset = _faulting("mset", writes=True)
+    mget = _faulting("mget")
+    scan_by_prefix = _faulting("scan_by_prefix")
+    get_at = _faulting("get_at")
+    mget_at = _faulting("mget_at")
+    delete_at = _faulting("delete_at")
+    scan_by_prefix_at = _faulting("scan_by_prefix_at")
+
+    def backup(self, timestamp):
+        self._clean_expired(timestamp)
+        for key in [key for key in self._dirty if key in self._spilled]:
+            self._load(key, enforce=False)
+        count = int(super().backup(timestamp)) + self._spilled_records
+        self._enforce_budget()
+        return str(count)
+
+    def compact(self):
+        super().compact()
+        for key in list(self._spilled):
+            (data,) = self.store.execute("SELECT data FROM spilled WHERE key = ?", (key,)).fetchone()
+            record, chain = pickle.loads(data)
+            if chain is None:
+                continue
+            self.versions[key] = chain
+            self._prune(key)
+            chain = self.versions.pop(key, None)
+            if record is None and chain is None:
+                self.store.execute("DELETE FROM spilled WHERE key = ?", (key,))
+                del self._spilled[key]
+            else:
+                self.store.execute("UPDATE spilled SET data = ? WHERE key = ?",
+                                   (pickle.dumps((record, chain), pickle.HIGHEST_PROTOCOL), key))
+
+    def restore(self, timestamp, timestamp_to_restore):
+        super().restore(timestamp, timestamp_to_restore)
+        restore_time = self.backups[bisect_right(self.backups, timestamp_to_restore) - 1]
+        for key in list(self._spilled):
+            (data,) = self.store.execute("SELECT data FROM spilled WHERE key = ?", (key,)).fetchone()
+            record, chain = pickle.loads(data)
+            if self._spilled.pop(key):
+                self._spilled_records -= 1
+            if chain is None:
+                self.store.execute("DELETE FROM spilled WHERE key = ?", (key,))
+                continue
+            times, states = chain
+            j = bisect_right(times, restore_time) - 1
+            if j >= 0 and states[j] is not None:
+                self._restore_record(key, *states[j], timestamp, restore_time)
+                self._owned.add(key)
+            self.versions[key] = chain
+            self._dirty.add(key)
+            self._spill(key)
+        self._rebuild_expiry_heap()
+        self._clock = OrderedDict((key, False) for key in self.database.keys() | self.versions.keys())
+        if self.indexes is not None:
+            self.indexes.reset(self.database)
+            for key, live in self._spilled.items():
+                if live:
+                    self.indexes.touch(key)
+        self._enforce_budget()
+        return ""
+
+
+if __name__ == "__main__":
+    import sys
+    from benchmark import generate_workload
+    from executor import CommandExecutor
+
+    db = TieredInMemoryDatabase(resident_records=int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
+    load, run = generate_workload("L4", operations=200000, records=20000, fields=16)
+    executor = CommandExecutor(db)
+    executor.execute(load)
+    executor.execute(run)
+    print(f"{len(db.database)} resident records, {db._spilled_records} spilled, "
+          f"store {os.path.getsize(db.path) / 1e6:.1f} MB")
+    db.close()
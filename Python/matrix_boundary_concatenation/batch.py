@@ -0,0 +1,97 @@
+"""
+matrix_boundary_concatenation for many (A, B) pairs at once.
+
+The flat positions of the first n boundary layers of a rows x cols matrix are a
+prefix of its spiral order, which traversal_engine caches per shape. A stack of
+matrices of one shape, (batch, rows, cols), is therefore answered by a single
+gather, stack.reshape(batch, -1)[:, positions]:
+- boundary_layers_batch(stack, n): the (batch, k) array of the layers of each matrix
+- solution_batch(stack_A, stack_B, n): the (batch, k_A + k_B) array of the answers
+  of solution() for the pairs (stack_A[i], stack_B[i]); A and B may have
+  different, rectangular shapes.
+
+iter_solutions(pairs, n, chunk_size, processes) streams the answers for an
+iterator of pairs: it reads chunk_size pairs at a time, stacks the pairs of
+each shape combination in the chunk, and yields the list of the chunk's answers
+(in input order, as solution() returns them), so memory stays bounded by one
+chunk per process. With processes, chunks are answered by a multiprocessing
+pool, still yielded in order.
+"""
+from functools import partial
+from itertools import islice
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "traversal_engine"))
+from traversal_engine import boundary_length, traversal_order
+
+
+def boundary_positions(shape, n):
+    """Flat positions of the cells of the first n boundary layers of a matrix of shape."""
+    return traversal_order(tuple(shape), "spiral")[:boundary_length(shape, n)]
+
+
+def boundary_layers_batch(stack, n):
+    """(batch, k) array of the first n boundary layers of each matrix of a (batch, rows, cols) stack."""
+    stack = np.asarray(stack)
+    return stack.reshape(len(stack), -1)[:, boundary_positions(stack.shape[1:], n)]
+
+
+def solution_batch(stack_A, stack_B, n):
+    """(batch, k_A + k_B) array of solution(stack_A[i], stack_B[i], n) for every i."""
+    return np.concatenate([boundary_layers_batch(stack_A, n), boundary_layers_batch(stack_B, n)], axis=1)
+
+
+def _shape(matrix):
+    return matrix.shape if isinstance(matrix, np.ndarray) else (len(matrix), len(matrix[0]) if matrix else 0)
+
+
+def solve_chunk(n, pairs):
+    """solution(A, B, n) for each pair of a list, computed one stack per shape combination."""
+    groups = {}
+    for i, (A, B) in enumerate(pairs):
+        groups.setdefault((_shape(A), _shape(B)), []).append(i)
+    results = [None] * len(pairs)
+    for (shape_A, shape_B), indices in groups.items():
+        stack_A = np.array([pairs[i][0] for i in indices]).reshape(len(indices), *shape_A)
+        stack_B = np.array([pairs[i][1] for i in indices]).reshape(len(indices), *shape_B)
+        for i, answer in zip(indices, solution_batch(stack_A, stack_B, n).tolist()):
+            results[i] = answer
+    return results
+
+
+def _chunks(pairs, chunk_size):
+    pairs = iter(pairs)
+    while chunk := list(islice(pairs, chunk_size)):
+        yield chunk
+
+
+def iter_solutions(pairs, n, chunk_size=4096, processes=None):
+    """Yield the answers for an iterable of (A, B) pairs, as lists of at most chunk_size answers."""
+    if not processes:
+        for chunk in _chunks(pairs, chunk_size):
+            yield solve_chunk(n, chunk)
+        return
+    from multiprocessing import Pool
+    with Pool(processes) as pool:
+        yield from pool.imap(partial(solve_chunk, n), _chunks(pairs, chunk_size))
+
+
+if __name__ == "__main__":
+    import time
+    from solution import solution
+
+    rng = np.random.default_rng(0)
+    stack_A, stack_B = rng.integers(0, 100, size=(2, 200_000, 6, 8))
+    start = time.perf_counter()
+    answers = solution_batch(stack_A, stack_B, 2)
+    print(f"200000 pairs stacked:  {time.perf_counter() - start:6.3f} s")
+    pairs = list(zip(stack_A.tolist(), stack_B.tolist()))
+    start = time.perf_counter()
+    streamed = [answer for chunk in iter_solutions(pairs, 2) for answer in chunk]
+    print(f"200000 pairs streamed: {time.perf_counter() - start:6.3f} s")
+    start = time.perf_counter()
+    expected = [solution(A, B, 2) for A, B in pairs]
+    print(f"200000 pairs one by one: {time.perf_counter() - start:6.3f} s")
+    assert answers.tolist() == streamed == expected
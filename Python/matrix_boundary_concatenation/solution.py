@@ -1,21 +1,15 @@
 """ matrix_boundary_concatenation """
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "traversal_engine"))
+from traversal_engine import boundary_layers
+
+
 def solution(matrix_A, matrix_B, n):
     def extract_boundary_layers(matrix, num_layers):
-        """Extracts the first `num_layers` boundary layers from a square matrix."""
-        layers = []
-        size = len(matrix)
-        for layer in range(num_layers):
-            # Top row (left to right)
-            layers.extend(matrix[layer][layer:size - layer])
-            # Right column (top to bottom, excluding the first already added)
-            layers.extend(matrix[row][size - layer - 1] for row in range(layer + 1, size - layer))
-            # Bottom row (right to left, excluding the corners)
-            if size - layer - 1 > layer:  # Ensure there's a bottom row
-                layers.extend(matrix[size - layer - 1][col] for col in range(size - layer - 2, layer - 1, -1))
-            # Left column (bottom to top, excluding the corners)
-            if size - layer - 1 > layer:  # Ensure there's a left column
-                layers.extend(matrix[row][layer] for row in range(size - layer - 2, layer, -1))
-        return layers
+        """Extracts the first `num_layers` boundary layers from a matrix."""
+        return boundary_layers(matrix, num_layers).tolist()
 
     # Extract n layers from both matrices
     layers_A = extract_boundary_layers(matrix_A, n)
@@ -1,4 +1,6 @@
 import unittest
+import numpy as np
+from batch import boundary_layers_batch, iter_solutions, solution_batch
 from solution import solution
 
 class TestSolution(unittest.TestCase):
@@ -38,5 +40,29 @@ class TestSolution(unittest.TestCase):
         expected_output = [1, 2, 3, 4, 5, 10, 15, 20, 25, 24, 23, 22, 21, 16, 11, 6, 7, 8, 9, 14, 19, 18, 17, 12, 13, 26, 27, 28, 29, 30, 35, 40, 45, 50, 49, 48, 47, 46, 41, 36, 31, 32, 33, 34, 39, 44, 43, 42, 37, 38]
         self.assertEqual(solution(matrix_A, matrix_B, n), expected_output)
 
+class TestBatch(unittest.TestCase):
+
+    def test1(self):
+        rng = np.random.default_rng(0)
+        stack_A, stack_B = rng.integers(0, 100, size=(5, 4, 6)), rng.integers(0, 100, size=(5, 7, 3))
+        for n in range(4):
+            expected = [solution(A, B, n) for A, B in zip(stack_A.tolist(), stack_B.tolist())]
+            self.assertEqual(solution_batch(stack_A, stack_B, n).tolist(), expected)
+        self.assertEqual(boundary_layers_batch(np.arange(8).reshape(2, 2, 2), 1).tolist(), [[0, 1, 3, 2], [4, 5, 7, 6]])
+        self.assertEqual(boundary_layers_batch(np.arange(8).reshape(2, 2, 2), -1).tolist(), [[], []])
+        matrix = [list(range(i, i + 10)) for i in range(0, 100, 10)]
+        self.assertEqual(solution(matrix, matrix, -1), [])
+
+    def test2(self):
+        rng = np.random.default_rng(1)
+        pairs = [(rng.integers(0, 9, size=(rows, cols)).tolist(), rng.integers(0, 9, size=(cols, rows)))
+                 for rows, cols in rng.integers(1, 5, size=(30, 2))]
+        expected = [solution(A, B, 2) for A, B in pairs]
+        for processes in (None, 2):
+            chunks = list(iter_solutions(iter(pairs), 2, chunk_size=7, processes=processes))
+            self.assertEqual([len(chunk) for chunk in chunks], [7, 7, 7, 7, 2])
+            self.assertEqual([answer for chunk in chunks for answer in chunk], expected)
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
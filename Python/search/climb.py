@@ -0,0 +1,100 @@
+"""
+Steepest-ascent climbing from every cell of a grid at once.
+
+A hiker at a cell steps to its highest strictly higher neighbour (north, south,
+west, east; the first of them on ties), as path_traverse in peak_finding.py
+does, and stops at a cell with no higher neighbour: its peak.
+
+PeakMap(grid) computes, for the whole grid:
+- next_step: the flat index of the cell each cell steps to (itself at a peak),
+  found with four shifted comparisons of the grid against itself.
+- peak: the flat index of the peak each cell ends up at. All cells are resolved
+  together by pointer jumping, peak = peak[peak], restricted each round to the
+  cells whose pointer has not reached a peak yet, so a path of length L costs
+  O(log L) rounds of NumPy gathers over the unresolved cells.
+
+After that every start query is a lookup: peak_of(row, col) for one cell,
+peaks_of(rows, cols) for arrays of them.
+"""
+import numpy as np
+
+# North, south, west, east: the order path_traverse breaks ties in
+DIRECTIONS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+
+
+def _shifted(shape, dr, dc):
+    """Slices (cells, neighbours) pairing every cell having a neighbour at (dr, dc) with it."""
+    rows, cols = shape
+    cells = (slice(max(0, -dr), rows - max(0, dr)), slice(max(0, -dc), cols - max(0, dc)))
+    neighbours = (slice(max(0, dr), rows - max(0, -dr)), slice(max(0, dc), cols - max(0, -dc)))
+    return cells, neighbours
+
+
+def next_steps(grid):
+    """Flat index of the steepest-ascent step of every cell of grid (the cell itself at a peak)."""
+    grid = np.asarray(grid)
+    rows, cols = grid.shape
+    dtype = np.int32 if rows * cols < 1 << 31 else np.int64
+    index = np.arange(rows * cols, dtype=dtype).reshape(rows, cols)
+    step, highest = index.copy(), grid.copy()
+    for dr, dc in DIRECTIONS:
+        cells, neighbours = _shifted(grid.shape, dr, dc)
+        higher = grid[neighbours] > highest[cells]
+        highest[cells] = np.where(higher, grid[neighbours], highest[cells])
+        step[cells] = np.where(higher, index[neighbours], step[cells])
+    return step.reshape(-1)
+
+
+def resolve(next_step):
+    """Flat index of the cell every path of next_step ends at, by pointer jumping."""
+    peak = next_step.copy()
+    at_peak = next_step == np.arange(next_step.size, dtype=next_step.dtype)
+    active = np.flatnonzero(~at_peak[next_step]).astype(next_step.dtype, copy=False)
+    while active.size:
+        jumped = peak[peak[active]]
+        peak[active] = jumped
+        active = active[~at_peak[jumped]]
+    return peak
+
+
+class PeakMap:
+    def __init__(self, grid):
+        grid = np.asarray(grid)
+        self.shape = grid.shape
+        self.next_step = next_steps(grid)
+        self.peak = resolve(self.next_step)
+
+    def next_of(self, row, col):
+        """The cell the hiker at (row, col) steps to, or None at a peak."""
+        cell = row * self.shape[1] + col
+        step = int(self.next_step[cell])
+        return None if step == cell else divmod(step, self.shape[1])
+
+    def peak_of(self, row, col):
+        """The peak reached from (row, col)."""
+        return divmod(int(self.peak[row * self.shape[1] + col]), self.shape[1])
+
+    def peaks_of(self, rows, cols):
+        """(rows, cols) arrays of the peaks reached from the cells (rows[i], cols[i])."""
+        return np.divmod(self.peak[np.asarray(rows) * self.shape[1] + np.asarray(cols)], self.shape[1])
+
+    def peaks(self):
+        """(rows, cols) arrays of all peaks, in row-major order."""
+        return np.divmod(np.flatnonzero(self.next_step == np.arange(self.next_step.size)), self.shape[1])
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 4096
+    rng = np.random.default_rng(0)
+    for name, grid in [("random", rng.integers(0, 1 << 30, size=(size, size), dtype=np.int32)),
+                       ("ramp", np.add.outer(np.arange(size, dtype=np.int32), np.arange(size, dtype=np.int32)))]:
+        start = time.perf_counter()
+        peak_map = PeakMap(grid)
+        built = time.perf_counter()
+        rows, cols = rng.integers(0, size, size=(2, 1_000_000))
+        peak_map.peaks_of(rows, cols)
+        print(f"{name:<7} {size}x{size}: built in {built - start:5.2f} s, "
+              f"1M queries in {(time.perf_counter() - built) * 1e3:5.1f} ms")
@@ -0,0 +1,109 @@
+"""
+A PeakMap kept up to date under changes of single cells.
+
+update(row, col, height) changes one altitude. Only the steps of the cell and
+its four neighbours can change, so those five are recomputed with
+path_traverse. The cells whose peak can change are exactly those whose climb now
+passes through a cell whose step changed: the changed cells and everything
+climbing into them, found by walking the step pointers backwards (the cells
+stepping to a cell are among its four neighbours). Their peaks are resolved
+again, each once, by following the steps to a cell outside that set, whose
+peak is unaffected.
+
+update_many(rows, cols, heights) applies a batch of changes with a single
+resolution, so a cell affected by several changes is resolved once. The cost of
+an update depends on the size of the affected climb trees, not on the size of
+the grid.
+"""
+import numpy as np
+from climb import DIRECTIONS, PeakMap
+from peak_finding import path_traverse
+
+
+class DynamicPeakMap(PeakMap):
+    def __init__(self, grid):
+        super().__init__(grid)
+        self.grid = np.array(grid)
+
+    def is_peak(self, row, col):
+        cell = row * self.shape[1] + col
+        return int(self.next_step[cell]) == cell
+
+    def update(self, row, col, height):
+        self.update_many([row], [col], [height])
+
+    def update_many(self, rows, cols, heights):
+        """Set the altitude of the cells (rows[i], cols[i]) to heights[i] and repair the map."""
+        n, m = self.shape
+        # Widen the grid so that no height is rounded or overflows (e.g. float readings on an int grid)
+        dtype = np.result_type(self.grid.dtype, np.asarray(heights).dtype)
+        if dtype != self.grid.dtype:
+            self.grid = self.grid.astype(dtype)
+        around = set()
+        for row, col, height in zip(rows, cols, heights):
+            self.grid[row, col] = height
+            around.add((row, col))
+            around.update((row + dr, col + dc) for dr, dc in DIRECTIONS if 0 <= row + dr < n and 0 <= col + dc < m)
+        changed = []
+        for row, col in around:
+            step = path_traverse(self.grid, row, col)
+            cell, target = row * m + col, row * m + col if step is None else step[0] * m + step[1]
+            if int(self.next_step[cell]) != target:
+                self.next_step[cell] = target
+                changed.append(cell)
+        self._resolve(self._climbing_into(changed))
+
+    def _climbing_into(self, cells):
+        """The cells whose climb passes through one of cells, cells included."""
+        n, m = self.shape
+        found, pending = set(cells), list(cells)
+        while pending:
+            cell = pending.pop()
+            row, col = divmod(cell, m)
+            for dr, dc in DIRECTIONS:
+                r, c = row + dr, col + dc
+                if 0 <= r < n and 0 <= c < m:
+                    below = r * m + c
+                    if int(self.next_step[below]) == cell and below not in found:
+                        found.add(below)
+                        pending.append(below)
+        return found
+
+    def _resolve(self, affected):
+        """Recompute the peaks of the cells of affected, whose climbs may end elsewhere now."""
+        resolved = {}
+        for cell in affected:
+            path = []
+            while cell in affected and cell not in resolved:
+                path.append(cell)
+                step = int(self.next_step[cell])
+                if step == cell:
+                    break
+                cell = step
+            if cell in resolved:
+                peak = resolved[cell]
+            elif cell in affected:
+                peak = cell
+            else:
+                peak = int(self.peak[cell])
+            for visited in path:
+                resolved[visited] = peak
+                self.peak[visited] = peak
+
+
+if __name__ == "__main__":
+    import time
+
+    rng = np.random.default_rng(0)
+    for size in (256, 1024, 4096):
+        peak_map = DynamicPeakMap(rng.integers(0, 1 << 30, size=(size, size), dtype=np.int32))
+        rows, cols, heights = rng.integers(0, size, size=10_000), rng.integers(0, size, size=10_000), \
+            rng.integers(0, 1 << 30, size=10_000)
+        start = time.perf_counter()
+        for row, col, height in zip(rows.tolist(), cols.tolist(), heights.tolist()):
+            peak_map.update(row, col, height)
+        single = (time.perf_counter() - start) / 10_000
+        start = time.perf_counter()
+        peak_map.update_many(rows.tolist(), cols.tolist(), (heights // 2).tolist())
+        batch = (time.perf_counter() - start) / 10_000
+        print(f"{size:>4}x{size:<4}: {single * 1e6:6.1f} us per update, {batch * 1e6:6.1f} us per update in a batch")
@@ -0,0 +1,95 @@
+"""
+The whole-grid maps of stencils.py and climb.py computed by a pool of processes.
+
+peak_maps(grid, tile_shape, processes) copies grid once into a block of
+multiprocessing.shared_memory and allocates the outputs there too:
+- highest: highest_neighbour(grid)
+- next_step: climb.next_steps(grid), as global flat indices
+- maxima: local_maxima(grid)
+
+The grid is cut into tiles of tile_shape. A worker attaches the blocks by name
+(no copy), takes its tile together with a one-cell halo of the neighbouring
+tiles, runs the serial stencils on that window and writes the tile's interior
+into the outputs. Every interior cell has all its neighbours in the window, so
+the stitched maps equal the serial ones exactly.
+"""
+from multiprocessing import Pool, shared_memory
+import os
+import numpy as np
+from climb import next_steps
+from stencils import highest_neighbour, local_maxima
+
+_blocks = {}
+
+
+def _attach(specs):
+    """Pool initializer: map the shared blocks of specs (name -> (block name, shape, dtype))."""
+    for key, (name, shape, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=name)
+        _blocks[key] = (block, np.ndarray(shape, dtype=dtype, buffer=block.buf))
+
+
+def _tile(bounds):
+    top, bottom, left, right = bounds
+    grid = _blocks["grid"][1]
+    n, m = grid.shape
+    up, down, west, east = max(top - 1, 0), min(bottom + 1, n), max(left - 1, 0), min(right + 1, m)
+    window = grid[up:down, west:east]
+    interior = (slice(top - up, bottom - up), slice(left - west, right - west))
+    _blocks["highest"][1][top:bottom, left:right] = highest_neighbour(window)[interior]
+    _blocks["maxima"][1][top:bottom, left:right] = local_maxima(window)[interior]
+    rows, cols = np.divmod(next_steps(window).reshape(window.shape)[interior].astype(np.int64), east - west)
+    _blocks["next_step"][1][top:bottom, left:right] = (rows + up) * m + cols + west
+
+
+def tiles(shape, tile_shape):
+    """(top, bottom, left, right) bounds of the tiles of tile_shape covering a grid of shape."""
+    n, m = shape
+    return [(top, min(top + tile_shape[0], n), left, min(left + tile_shape[1], m))
+            for top in range(0, n, tile_shape[0]) for left in range(0, m, tile_shape[1])]
+
+
+def peak_maps(grid, tile_shape=(1024, 1024), processes=None):
+    """(highest, next_step, maxima) maps of grid, computed tile by tile by a pool of processes."""
+    grid = np.asarray(grid)
+    n, m = grid.shape
+    dtypes = {"grid": grid.dtype, "highest": grid.dtype, "next_step": np.int32 if n * m < 1 << 31 else np.int64,
+              "maxima": np.bool_}
+    blocks, specs, arrays = [], {}, {}
+    try:
+        for key, dtype in dtypes.items():
+            block = shared_memory.SharedMemory(create=True, size=max(n * m * np.dtype(dtype).itemsize, 1))
+            blocks.append(block)
+            specs[key] = (block.name, (n, m), dtype)
+            arrays[key] = np.ndarray((n, m), dtype=dtype, buffer=block.buf)
+        arrays["grid"][:] = grid
+        with Pool(processes or os.cpu_count(), initializer=_attach, initargs=(specs,)) as pool:
+            for _ in pool.imap_unordered(_tile, tiles((n, m), tile_shape)):
+                pass
+        return arrays["highest"].copy(), arrays["next_step"].reshape(-1).copy(), arrays["maxima"].copy()
+    finally:
+        # The views must go before the blocks can be closed
+        arrays.clear()
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    from climb import resolve
+
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 4096
+    grid = np.random.default_rng(0).integers(0, 1 << 30, size=(size, size), dtype=np.int32)
+    start = time.perf_counter()
+    expected = highest_neighbour(grid), next_steps(grid), local_maxima(grid)
+    serial = time.perf_counter() - start
+    start = time.perf_counter()
+    maps = peak_maps(grid)
+    parallel = time.perf_counter() - start
+    assert all(np.array_equal(a, b) for a, b in zip(maps, expected))
+    start = time.perf_counter()
+    resolve(maps[1])
+    print(f"{size}x{size} on {os.cpu_count()} cores: serial {serial:.2f} s, parallel {parallel:.2f} s, "
+          f"peaks resolved in {time.perf_counter() - start:.2f} s")
@@ -43,15 +43,16 @@ def path_traverse(elevation_map, start_x, start_y):
     # Return the best position if found; otherwise, None
     return best_position
 
-# Example mountain terrain grid
-mountain = [[1, 2, 3],
-            [2, 5, 7],
-            [4, 6, 9]]
-print(f"the altitude of the highest peak reachable {find_peak(mountain, 0, 1)}")
-# Hiking exploration example where the hiker looks for a higher peak around
-print("Next peak at coordinates:", find_next_peak_coordinates(mountain, 0, 1))
-
-if next_step := path_traverse(mountain, 0,1):
-    print("Next step to higher elevation:", next_step)
-else:
-    print("No higher adjacent step found.")
+if __name__ == "__main__":
+    # Example mountain terrain grid
+    mountain = [[1, 2, 3],
+                [2, 5, 7],
+                [4, 6, 9]]
+    print(f"the altitude of the highest peak reachable {find_peak(mountain, 0, 1)}")
+    # Hiking exploration example where the hiker looks for a higher peak around
+    print("Next peak at coordinates:", find_next_peak_coordinates(mountain, 0, 1))
+
+    if next_step := path_traverse(mountain, 0,1):
+        print("Next step to higher elevation:", next_step)
+    else:
+        print("No higher adjacent step found.")
@@ -0,0 +1,85 @@
+"""
+Whole-grid versions of the neighbour checks of peak_finding.py.
+
+The grid is padded with one ring of the lowest value of its dtype, so the four
+neighbours of every cell are plain shifted views of the padded array, in the
+order north, south, west, east, and each map below is a few NumPy operations
+with no Python loop over cells:
+- highest_neighbour(grid): the altitude find_peak returns for every cell
+- steepest_direction(grid): the index in DIRECTIONS of the step path_traverse
+  takes from every cell, -1 where there is no higher neighbour
+- local_maxima(grid): the cells with no higher neighbour
+
+find_peak_2d(grid) finds a single local maximum by divide and conquer, reading
+only O(n + m) cells of an n x m grid.
+"""
+import numpy as np
+from climb import DIRECTIONS
+
+
+def _lowest(dtype):
+    return -np.inf if dtype.kind == "f" else np.iinfo(dtype).min
+
+
+def neighbours(grid):
+    """(4, n, m) array of the north, south, west and east neighbours of every cell,
+    the lowest value of the dtype where there is none."""
+    grid = np.asarray(grid)
+    rows, cols = grid.shape
+    padded = np.pad(grid, 1, constant_values=_lowest(grid.dtype))
+    return np.stack([padded[1 + dr:1 + dr + rows, 1 + dc:1 + dc + cols] for dr, dc in DIRECTIONS])
+
+
+def highest_neighbour(grid):
+    """For every cell, the highest of its altitude and its neighbours' altitudes."""
+    return np.maximum(np.asarray(grid), neighbours(grid).max(axis=0))
+
+
+def steepest_direction(grid):
+    """For every cell, the index in DIRECTIONS of its highest higher neighbour (the first on ties),
+    or -1 if none is higher."""
+    around = neighbours(grid)
+    direction = around.argmax(axis=0)
+    higher = np.take_along_axis(around, direction[np.newaxis], axis=0)[0] > np.asarray(grid)
+    return np.where(higher, direction, -1)
+
+
+def local_maxima(grid):
+    """Boolean map of the cells no neighbour of which is higher."""
+    return (neighbours(grid) <= np.asarray(grid)).all(axis=0)
+
+
+def _enclosing(lines, i):
+    """The open interval strictly between the two consecutive lines around i."""
+    k = np.searchsorted(lines, i)
+    return lines[k - 1] + 1, lines[k] - 1
+
+
+def find_peak_2d(grid):
+    """(row, col) of a local maximum of grid.
+
+    The window, initially the whole grid, is cut by its border, middle row and
+    middle column into four quadrants. If the highest cell on those lines has a
+    higher neighbour, that neighbour is higher than everything around its
+    quadrant, so a climb from it stays inside: the search continues in that
+    quadrant alone. Each step reads O(rows + cols) cells and halves the window."""
+    grid = np.asarray(grid)
+    top, bottom, left, right = 0, grid.shape[0] - 1, 0, grid.shape[1] - 1
+    while True:
+        rows = np.unique([top, (top + bottom) // 2, bottom])
+        cols = np.unique([left, (left + right) // 2, right])
+        across, down = grid[rows, left:right + 1], grid[top:bottom + 1, cols]
+        if across.max() >= down.max():
+            i, j = np.unravel_index(across.argmax(), across.shape)
+            row, col = int(rows[i]), left + int(j)
+        else:
+            i, j = np.unravel_index(down.argmax(), down.shape)
+            row, col = top + int(i), int(cols[j])
+        best, step = grid[row, col], None
+        for dr, dc in DIRECTIONS:
+            r, c = row + dr, col + dc
+            if 0 <= r < grid.shape[0] and 0 <= c < grid.shape[1] and grid[r, c] > best:
+                best, step = grid[r, c], (r, c)
+        if step is None:
+            return row, col
+        (top, bottom), (left, right) = _enclosing(rows, step[0]), _enclosing(cols, step[1])
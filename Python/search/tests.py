@@ -0,0 +1,107 @@
+import unittest
+import numpy as np
+from climb import DIRECTIONS, PeakMap, next_steps
+from dynamic import DynamicPeakMap
+from parallel import peak_maps
+from peak_finding import find_peak, path_traverse
+from stencils import find_peak_2d, highest_neighbour, local_maxima, steepest_direction
+
+
+def climb(grid, row, col):
+    while step := path_traverse(grid, row, col):
+        row, col = step
+    return row, col
+
+
+class PeakMapTest(unittest.TestCase):
+    def test1(self):
+        mountain = [[1, 2, 3],
+                    [2, 5, 7],
+                    [4, 6, 9]]
+        peak_map = PeakMap(mountain)
+        self.assertEqual(peak_map.next_of(0, 1), (1, 1))
+        self.assertEqual(peak_map.next_of(2, 2), None)
+        self.assertEqual(peak_map.peak_of(0, 0), (2, 2))
+        self.assertEqual([r.tolist() for r in peak_map.peaks()], [[2], [2]])
+
+    def test2(self):
+        rng = np.random.default_rng(1)
+        for shape in [(1, 1), (1, 7), (7, 1), (6, 9), (12, 12)]:
+            for high in (3, 1000):
+                grid = rng.integers(0, high, size=shape).tolist()
+                peak_map = PeakMap(grid)
+                rows, cols = np.divmod(np.arange(shape[0] * shape[1]), shape[1])
+                peak_rows, peak_cols = peak_map.peaks_of(rows, cols)
+                for r, c, pr, pc in zip(rows.tolist(), cols.tolist(), peak_rows.tolist(), peak_cols.tolist()):
+                    self.assertEqual(peak_map.next_of(r, c), path_traverse(grid, r, c))
+                    self.assertEqual((pr, pc), climb(grid, r, c))
+                    self.assertEqual(grid[pr][pc], find_peak(grid, pr, pc))
+
+
+class StencilsTest(unittest.TestCase):
+    def test1(self):
+        rng = np.random.default_rng(2)
+        for shape in [(1, 1), (1, 7), (7, 1), (6, 9), (12, 12)]:
+            for high in (3, 1000):
+                grid = rng.integers(0, high, size=shape)
+                altitudes, directions, maxima = highest_neighbour(grid), steepest_direction(grid), local_maxima(grid)
+                for r in range(shape[0]):
+                    for c in range(shape[1]):
+                        step = path_traverse(grid.tolist(), r, c)
+                        self.assertEqual(altitudes[r, c], find_peak(grid.tolist(), r, c))
+                        self.assertEqual(directions[r, c],
+                                         -1 if step is None else DIRECTIONS.index((step[0] - r, step[1] - c)))
+                        self.assertEqual(maxima[r, c], step is None)
+                self.assertTrue(maxima[find_peak_2d(grid)])
+                self.assertTrue(local_maxima(-grid.astype(float))[find_peak_2d(-grid.astype(float))])
+
+
+class ParallelTest(unittest.TestCase):
+    def test1(self):
+        rng = np.random.default_rng(3)
+        for shape, tile_shape in [((1, 1), (4, 4)), ((9, 13), (4, 5)), ((16, 7), (3, 16)), ((10, 10), (1, 1))]:
+            for high in (3, 1000):
+                grid = rng.integers(0, high, size=shape)
+                highest, next_step, maxima = peak_maps(grid, tile_shape, processes=2)
+                self.assertEqual(highest.tolist(), highest_neighbour(grid).tolist())
+                self.assertEqual(next_step.tolist(), next_steps(grid).tolist())
+                self.assertEqual(maxima.tolist(), local_maxima(grid).tolist())
+
+
+class DynamicPeakMapTest(unittest.TestCase):
+    def test1(self):
+        peak_map = DynamicPeakMap([[1, 2, 3],
+                                   [2, 5, 7],
+                                   [4, 6, 9]])
+        peak_map.update(0, 0, 10)
+        self.assertTrue(peak_map.is_peak(0, 0))
+        self.assertEqual(peak_map.peak_of(0, 1), (0, 0))
+        self.assertEqual(peak_map.peak_of(1, 1), (2, 2))
+        peak_map.update_many([2, 1], [2, 2], [0, 1])
+        self.assertEqual(peak_map.peak_of(1, 1), (2, 1))
+        self.assertEqual(peak_map.peak_of(2, 2), (2, 1))
+
+    def test3(self):
+        peak_map = DynamicPeakMap(np.array([[4, 3], [1, 4]], dtype=np.int8))
+        self.assertEqual(peak_map.peak_of(0, 1), (1, 1))
+        peak_map.update(0, 0, 4.5)
+        self.assertEqual(peak_map.grid[0, 0], 4.5)
+        self.assertEqual(peak_map.peak_of(0, 1), (0, 0))
+        peak_map.update(1, 1, 300)
+        self.assertEqual(peak_map.peak_of(0, 1), (1, 1))
+
+    def test2(self):
+        rng = np.random.default_rng(4)
+        for shape in [(1, 1), (1, 9), (8, 1), (7, 11)]:
+            for high in (3, 1000):
+                peak_map = DynamicPeakMap(rng.integers(0, high, size=shape))
+                for size in (1, 1, 3, 5):
+                    rows, cols = rng.integers(0, shape[0], size=size), rng.integers(0, shape[1], size=size)
+                    peak_map.update_many(rows.tolist(), cols.tolist(), rng.integers(0, high, size=size).tolist())
+                    expected = PeakMap(peak_map.grid)
+                    self.assertEqual(peak_map.next_step.tolist(), expected.next_step.tolist())
+                    self.assertEqual(peak_map.peak.tolist(), expected.peak.tolist())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+"""
+Binary grid files, read and written through numpy.memmap, and traversals that
+stream them in bounded chunks.
+
+File format (little-endian):
+    offset 0   magic b"GRID"
+    offset 4   dtype, the NumPy type string (e.g. b"<i4") padded with NUL bytes to 12 bytes
+    offset 16  rows, u64
+    offset 24  cols, u64
+    offset 64  rows * cols values in row-major order
+
+iter_positions(shape, order, chunk_size) yields the traversal as arrays of at
+most chunk_size flat cell indices, built from the runs of traversal_engine.segments(),
+and iter_values(grid, order, chunk_size) the values of those cells. Neither ever
+holds more than one chunk, so a memory-mapped grid larger than RAM streams in
+constant memory: only the pages of the cells being gathered are read in.
+"""
+import struct
+import numpy as np
+from traversal_engine import as_grid, boundary_length, segments
+
+MAGIC = b"GRID"
+HEADER = struct.Struct("<4s12sQQ")
+DATA_OFFSET = 64
+
+
+def create_grid(path, shape, dtype):
+    """Create a grid file of shape and dtype and return it as a writable memmap (filled with zeros)."""
+    dtype = np.dtype(dtype)
+    rows, cols = shape
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, dtype.str.encode(), rows, cols).ljust(DATA_OFFSET, b"\0"))
+        f.truncate(DATA_OFFSET + rows * cols * dtype.itemsize)
+    return open_grid(path, "r+")
+
+
+def write_grid(path, grid):
+    """Write a 2D array (or list of lists) to a grid file."""
+    grid = np.asarray(grid)
+    target = create_grid(path, grid.shape, grid.dtype)
+    target[:] = grid
+    target.flush()
+    del target
+
+
+def open_grid(path, mode="r"):
+    """The grid of a grid file as a memmap ("r" read-only, "r+" read-write)."""
+    with open(path, "rb") as f:
+        magic, dtype, rows, cols = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a grid file")
+    return np.memmap(path, dtype=np.dtype(dtype.rstrip(b"\0").decode()), mode=mode, offset=DATA_OFFSET,
+                     shape=(rows, cols))
+
+
+def iter_positions(shape, order, chunk_size=1 << 16, limit=None):
+    """Yield the flat indices of the first `limit` (default all) cells of the traversal, in
+    arrays of at most chunk_size."""
+    remaining = shape[0] * shape[1] if limit is None else limit
+    pending, size = [], 0
+    for start, step, count in segments(tuple(shape), order):
+        count = min(count, remaining)
+        remaining -= count
+        while count:
+            take = min(count, chunk_size - size)
+            pending.append(start + step * np.arange(take))
+            size += take
+            start += step * take
+            count -= take
+            if size == chunk_size:
+                yield np.concatenate(pending)
+                pending, size = [], 0
+        if not remaining:
+            break
+    if pending:
+        yield np.concatenate(pending)
+
+
+def iter_cells(shape, order, chunk_size=1 << 16):
+    """Yield the traversal as (rows, cols) arrays of at most chunk_size cells."""
+    for positions in iter_positions(shape, order, chunk_size):
+        yield np.divmod(positions, shape[1])
+
+
+def iter_values(grid, order, chunk_size=1 << 16, limit=None):
+    """Yield the values of grid (e.g. a memmap from open_grid) in traversal order, in arrays of at most chunk_size."""
+    if not isinstance(grid, np.ndarray):
+        grid = as_grid(grid)
+    flat = grid.reshape(-1)
+    for positions in iter_positions(grid.shape, order, chunk_size, limit):
+        yield flat[positions]
+
+
+def iter_boundary_layers(grid, layers, chunk_size=1 << 16):
+    """Yield the values of the outer `layers` boundary layers of grid, in arrays of at most chunk_size."""
+    return iter_values(grid, "spiral", chunk_size, boundary_length(np.shape(grid), layers))
+
+
+if __name__ == "__main__":
+    import os
+    import tempfile
+    import time
+
+    rows = cols = 8192
+    path = os.path.join(tempfile.mkdtemp(), "grid.bin")
+    grid = create_grid(path, (rows, cols), np.int32)
+    for i in range(0, rows, 1024):
+        grid[i:i + 1024] = np.arange(i * cols, (i + 1024) * cols, dtype=np.int32).reshape(1024, cols)
+    grid.flush()
+    del grid
+    print(f"{os.path.getsize(path) / 1e6:.0f} MB grid file")
+    grid = open_grid(path)
+    for order in ("snake", "spiral", "diagonal"):
+        start = time.perf_counter()
+        total = sum(int(chunk.sum(dtype=np.int64)) for chunk in iter_values(grid, order))
+        print(f"{order:<9} {time.perf_counter() - start:6.2f} s, checksum "
+              f"{'ok' if total == rows * cols * (rows * cols - 1) // 2 else 'wrong'}")
+    del grid
+    os.remove(path)
+    os.rmdir(os.path.dirname(path))
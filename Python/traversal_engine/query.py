@@ -0,0 +1,86 @@
+"""
+Traversal queries that only visit the matching cells.
+
+matches(grid, order, predicate) finds the cells of grid satisfying predicate
+with one vectorized test and np.nonzero, computes the position of each match in
+the traversal with closed-form index math (traversal_rank), and sorts the k
+matches alone, so no traversal order is built and the cost beyond the test is
+O(k log k). The predicate is either
+- a callable mapping the grid array to a boolean mask (e.g. lambda v: v < 0,
+  is_prime_array), or
+- a collection of values, tested with np.isin, or with a 256-entry lookup
+  table for byte grids (dtype uint8).
+
+traversal_rank(shape, order, rows, cols):
+- "row": r * m + c
+- "snake": r * m + c on even rows, r * m + m - 1 - c on odd ones
+- "spiral": spiral_index.spiral_index
+- "diagonal": the number of cells on the diagonals before r + c, counted by
+  inclusion-exclusion over the triangle r + c < d, plus the offset along the
+  diagonal in its direction
+"""
+import numpy as np
+from spiral_index import spiral_index
+from traversal_engine import ORDERS, as_grid
+
+
+def _triangle(x):
+    x = np.maximum(x, 0)
+    return x * (x + 1) // 2
+
+
+def traversal_rank(shape, order, rows, cols):
+    """Position (from 0) of each cell (rows[i], cols[i]) in the traversal of a grid of shape."""
+    n, m = shape
+    rows, cols = np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)
+    if order == "row":
+        return rows * m + cols
+    if order == "snake":
+        return rows * m + np.where(rows % 2 == 0, cols, m - 1 - cols)
+    if order == "spiral":
+        return spiral_index(shape, rows, cols)
+    if order == "diagonal":
+        d = rows + cols
+        before = _triangle(d) - _triangle(d - n) - _triangle(d - m) + _triangle(d - n - m)
+        low, high = np.maximum(0, d - m + 1), np.minimum(d, n - 1)
+        return before + np.where(d % 2 == 0, high - rows, rows - low)
+    raise ValueError(f"Unknown traversal order {order!r}, expected one of {ORDERS}")
+
+
+def match_mask(grid, predicate):
+    """Boolean array of the cells of grid (an array) satisfying predicate."""
+    if callable(predicate):
+        return np.asarray(predicate(grid), dtype=bool)
+    values = list(predicate)
+    if grid.dtype == np.uint8:
+        table = np.zeros(256, dtype=bool)
+        table[[value for value in values if 0 <= value < 256]] = True
+        return table[grid]
+    return np.isin(grid, values)
+
+
+def matches(grid, order, predicate):
+    """(ranks, rows, cols) of the cells of grid satisfying predicate, sorted by their position
+    (from 0) in the traversal."""
+    grid = as_grid(grid)
+    rows, cols = np.nonzero(match_mask(grid, predicate))
+    ranks = traversal_rank(grid.shape, order, rows, cols)
+    by_rank = np.argsort(ranks)
+    return ranks[by_rank], rows[by_rank], cols[by_rank]
+
+
+if __name__ == "__main__":
+    import time
+    from traversal_engine import traverse
+
+    rng = np.random.default_rng(0)
+    grid = rng.integers(-1, 10 ** 6, size=(4096, 4096))
+    for order in ORDERS:
+        start = time.perf_counter()
+        ranks, _, _ = matches(grid, order, lambda values: values < 0)
+        pushed = time.perf_counter() - start
+        start = time.perf_counter()
+        expected = np.flatnonzero(traverse(grid, order) < 0)
+        assert np.array_equal(ranks, expected)
+        print(f"{order:<9} {len(ranks)} matches: {pushed * 1e3:6.1f} ms pushed down, "
+              f"{(time.perf_counter() - start) * 1e3:6.1f} ms full traversal")
@@ -0,0 +1,138 @@
+"""
+Random access into the clockwise spiral of an n x m grid, without building it.
+
+Boundary layer L starts at spiral index boundary_length(shape, L) = 2L(n + m - 2L),
+and the cells of a layer are its top row, right column, bottom row and left
+column in turn, so both directions are closed-form ring arithmetic:
+- spiral_index(shape, row, col): the layer is the cell's distance to the nearest
+  edge, and the offset in the layer follows from the side the cell is on.
+- spiral_cell(shape, k): the layer is the largest L with 2L(n + m - 2L) <= k,
+  a root of a quadratic, and the side and cell follow from the offset.
+
+Both take scalars or NumPy arrays and cost O(1) per cell. SpiralCells(shape)
+wraps them as a sequence: cells[k] is the k-th cell, cells[k0:k1] the (rows,
+cols) arrays of only the cells k0 to k1 - 1, and cells.index(row, col) the
+inverse. Since the first boundary_length(shape, layers) cells of the spiral are
+the outer `layers` boundary layers, the same indices address those.
+"""
+from math import isqrt
+import numpy as np
+from traversal_engine import boundary_length
+
+
+def _sides(shape, layer):
+    n, m = shape
+    top, left, bottom, right = layer, layer, n - 1 - layer, m - 1 - layer
+    return top, left, bottom, right, right - left, bottom - top
+
+
+def _index(shape, row, col):
+    n, m = shape
+    if not (0 <= row < n and 0 <= col < m):
+        raise IndexError(f"Cell ({row}, {col}) outside a grid of shape {tuple(shape)}")
+    layer = min(row, col, n - 1 - row, m - 1 - col)
+    top, left, bottom, right, width, height = _sides(shape, layer)
+    if row == top:
+        offset = col - left
+    elif col == right:
+        offset = width + row - top
+    elif row == bottom:
+        offset = width + height + right - col
+    else:
+        offset = 2 * width + height + bottom - row
+    return 2 * layer * (n + m - 2 * layer) + offset
+
+
+def _cell(shape, k):
+    n, m = shape
+    if not 0 <= k < n * m:
+        raise IndexError(f"Spiral index {k} outside a grid of shape {tuple(shape)}")
+    layer = min((n + m - isqrt((n + m) ** 2 - 4 * k)) // 4, (min(n, m) + 1) // 2 - 1)
+    if 2 * layer * (n + m - 2 * layer) > k:
+        layer -= 1
+    offset = k - 2 * layer * (n + m - 2 * layer)
+    top, left, bottom, right, width, height = _sides(shape, layer)
+    if offset <= width:
+        return top, left + offset
+    if offset <= width + height:
+        return top + offset - width, right
+    if offset <= 2 * width + height:
+        return bottom, right - (offset - width - height)
+    return bottom - (offset - 2 * width - height), left
+
+
+def spiral_index(shape, row, col):
+    """Position of the cell (row, col) in the clockwise spiral of a grid of shape."""
+    if np.ndim(row) == 0 and np.ndim(col) == 0:
+        return _index(shape, int(row), int(col))
+    n, m = shape
+    row, col = np.asarray(row), np.asarray(col)
+    if np.any((row < 0) | (row >= n) | (col < 0) | (col >= m)):
+        raise IndexError(f"Cell outside a grid of shape {tuple(shape)}")
+    layer = np.minimum(np.minimum(row, col), np.minimum(n - 1 - row, m - 1 - col))
+    top, left, bottom, right, width, height = _sides(shape, layer)
+    offset = np.select([row == top, col == right, row == bottom],
+                       [col - left, width + row - top, width + height + right - col],
+                       2 * width + height + bottom - row)
+    return 2 * layer * (n + m - 2 * layer) + offset
+
+
+def spiral_cell(shape, k):
+    """(row, col) of the k-th cell (from 0) of the clockwise spiral of a grid of shape."""
+    if np.ndim(k) == 0:
+        return _cell(shape, int(k))
+    n, m = shape
+    k = np.asarray(k, dtype=np.int64)
+    if np.any((k < 0) | (k >= n * m)):
+        raise IndexError(f"Spiral index outside a grid of shape {tuple(shape)}")
+    last = (min(n, m) + 1) // 2 - 1
+    # (n + m)^2 - 4k, written so that the float error shrinks with it towards the centre
+    root = np.sqrt(float((n - m) ** 2) + 4.0 * (n * m - k))
+    layer = np.clip(((n + m - root) // 4).astype(np.int64), 0, last)
+    # The square root is exact to within one layer
+    layer += (layer < last) & (2 * (layer + 1) * (n + m - 2 * (layer + 1)) <= k)
+    layer -= 2 * layer * (n + m - 2 * layer) > k
+    offset = k - 2 * layer * (n + m - 2 * layer)
+    top, left, bottom, right, width, height = _sides(shape, layer)
+    on_top, on_right, on_bottom = offset <= width, offset <= width + height, offset <= 2 * width + height
+    row = np.select([on_top, on_right, on_bottom], [top, top + offset - width, bottom],
+                    bottom - (offset - 2 * width - height))
+    col = np.select([on_top, on_right, on_bottom], [left + offset, right, right - (offset - width - height)], left)
+    return row, col
+
+
+class SpiralCells:
+    """The cells of a grid of shape in clockwise spiral order, computed on access."""
+
+    def __init__(self, shape):
+        self.shape = tuple(shape)
+
+    def __len__(self):
+        return max(self.shape[0], 0) * max(self.shape[1], 0)
+
+    def __getitem__(self, k):
+        if isinstance(k, slice):
+            return spiral_cell(self.shape, np.arange(*k.indices(len(self)), dtype=np.int64))
+        if k < 0:
+            k += len(self)
+        return spiral_cell(self.shape, k)
+
+    def index(self, row, col):
+        return spiral_index(self.shape, row, col)
+
+    def layer(self, layer):
+        """(rows, cols) arrays of the cells of boundary layer `layer`."""
+        return self[boundary_length(self.shape, layer):boundary_length(self.shape, layer + 1)]
+
+
+if __name__ == "__main__":
+    import time
+
+    cells = SpiralCells((10 ** 9, 10 ** 9 + 7))
+    start = time.perf_counter()
+    for k in range(0, 10 ** 18, 10 ** 13):
+        assert cells.index(*cells[k]) == k
+    print(f"100000 round trips on a 10^9 x 10^9 grid in {time.perf_counter() - start:.2f} s")
+    start = time.perf_counter()
+    rows, cols = cells[len(cells) // 2:len(cells) // 2 + 1_000_000]
+    print(f"1M-cell slice from the middle in {(time.perf_counter() - start) * 1e3:.1f} ms")
@@ -0,0 +1,122 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from grid_file import create_grid, iter_boundary_layers, iter_cells, iter_positions, iter_values, open_grid, write_grid
+from query import matches, traversal_rank
+from spiral_index import SpiralCells, spiral_cell, spiral_index
+from traversal_engine import ORDERS, boundary_layers, boundary_length, cells, ring_size, traversal_order, traverse
+
+
+class TraversalOrderTest(unittest.TestCase):
+    def test1(self):
+        grid = np.arange(12).reshape(3, 4)
+        self.assertEqual(traverse(grid, "row").tolist(), list(range(12)))
+        self.assertEqual(traverse(grid, "snake").tolist(), [0, 1, 2, 3, 7, 6, 5, 4, 8, 9, 10, 11])
+        self.assertEqual(traverse(grid, "spiral").tolist(), [0, 1, 2, 3, 7, 11, 10, 9, 8, 4, 5, 6])
+        self.assertEqual(traverse(grid, "diagonal").tolist(), [0, 1, 4, 8, 5, 2, 3, 6, 9, 10, 7, 11])
+
+    def test2(self):
+        for shape in [(1, 1), (1, 5), (5, 1), (2, 7), (6, 3), (5, 5), (8, 9)]:
+            for order in ("row", "snake", "spiral", "diagonal"):
+                self.assertEqual(sorted(traversal_order(shape, order).tolist()), list(range(shape[0] * shape[1])))
+
+    def test3(self):
+        grid = np.arange(25).reshape(5, 5)
+        self.assertEqual(boundary_length(grid.shape, 1), 16)
+        self.assertEqual(boundary_length(grid.shape, 10), 25)
+        self.assertEqual(boundary_length(grid.shape, -1), 0)
+        self.assertEqual(boundary_layers(grid, -1).tolist(), [])
+        self.assertEqual(boundary_layers(grid, 2).tolist(), traverse(grid, "spiral")[:24].tolist())
+        self.assertEqual(boundary_layers([["a", "b"], ["c", "d"]], 1).tolist(), ["a", "b", "d", "c"])
+
+    def test4(self):
+        rows, cols = cells((3, 4), "diagonal")
+        self.assertEqual(list(zip(rows.tolist(), cols.tolist()))[:4], [(0, 0), (0, 1), (1, 0), (2, 0)])
+        self.assertIs(traversal_order((3, 4), "spiral"), traversal_order((3, 4), "spiral"))
+        self.assertFalse(traversal_order((3, 4), "spiral").flags.writeable)
+        self.assertRaises(ValueError, traversal_order, (3, 4), "hilbert")
+        self.assertEqual(traverse([[1, 2 ** 64 - 1]], "row").tolist(), [1, 2 ** 64 - 1])
+
+
+class GridFileTest(unittest.TestCase):
+    def test1(self):
+        for shape in [(1, 1), (1, 9), (9, 1), (7, 5), (6, 11)]:
+            for order in ("row", "snake", "spiral", "diagonal"):
+                for chunk_size in (1, 4, 1000):
+                    chunks = list(iter_positions(shape, order, chunk_size))
+                    self.assertTrue(all(len(chunk) <= chunk_size for chunk in chunks))
+                    self.assertEqual(np.concatenate(chunks).tolist(), traversal_order(shape, order).tolist())
+
+    def test2(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "grid.bin")
+            grid = np.arange(42, dtype=np.int16).reshape(6, 7)
+            write_grid(path, grid)
+            mapped = open_grid(path)
+            self.assertEqual((mapped.shape, mapped.dtype), ((6, 7), np.int16))
+            self.assertEqual(np.concatenate(list(iter_values(mapped, "diagonal", 5))).tolist(),
+                             traverse(grid, "diagonal").tolist())
+            self.assertEqual(np.concatenate(list(iter_boundary_layers(mapped, 2, 3))).tolist(),
+                             boundary_layers(grid, 2).tolist())
+            rows, cols = next(iter_cells(grid.shape, "spiral", 8))
+            self.assertEqual(cols.tolist(), [0, 1, 2, 3, 4, 5, 6, 6])
+            del mapped
+
+            created = create_grid(path, (2, 3), "<f8")
+            created[1, 2] = 1.5
+            created.flush()
+            del created
+            self.assertEqual(open_grid(path)[1].tolist(), [0.0, 0.0, 1.5])
+            with open(path, "r+b") as f:
+                f.write(b"NOPE")
+            self.assertRaises(ValueError, open_grid, path)
+
+
+class SpiralIndexTest(unittest.TestCase):
+    def test1(self):
+        for shape in [(1, 1), (1, 6), (6, 1), (2, 7), (7, 2), (5, 5), (6, 9), (10, 4)]:
+            rows, cols = cells(shape, "spiral")
+            found_rows, found_cols = spiral_cell(shape, np.arange(shape[0] * shape[1]))
+            self.assertEqual((found_rows.tolist(), found_cols.tolist()), (rows.tolist(), cols.tolist()))
+            self.assertEqual(spiral_index(shape, rows, cols).tolist(), list(range(shape[0] * shape[1])))
+            for k, (row, col) in enumerate(zip(rows.tolist(), cols.tolist())):
+                self.assertEqual(spiral_cell(shape, k), (row, col))
+                self.assertEqual(spiral_index(shape, row, col), k)
+            for layers in range(5):
+                self.assertEqual(boundary_length(shape, layers), sum(ring_size(shape, layer) for layer in range(layers)))
+
+    def test2(self):
+        spiral = SpiralCells((10 ** 9, 10 ** 9 + 7))
+        self.assertEqual(spiral[1], (0, 1))
+        self.assertEqual(spiral[-1], (500000000, 499999999))
+        self.assertEqual(spiral.index(*spiral[123456789012345]), 123456789012345)
+        rows, cols = spiral[3 * 10 ** 9 + 11:3 * 10 ** 9 + 14]
+        self.assertEqual((rows.tolist(), cols.tolist()), ([999999999, 999999998, 999999997], [0, 0, 0]))
+        rows, cols = SpiralCells((4, 5)).layer(1)
+        self.assertEqual((rows.tolist(), cols.tolist()), ([1, 1, 1, 2, 2, 2], [1, 2, 3, 3, 2, 1]))
+        self.assertRaises(IndexError, spiral_cell, (3, 4), 12)
+        self.assertRaises(IndexError, spiral_index, (3, 4), 3, 0)
+
+
+class QueryTest(unittest.TestCase):
+    def test1(self):
+        for shape in [(1, 1), (1, 6), (6, 1), (2, 7), (5, 5), (6, 9)]:
+            for order in ORDERS:
+                rows, cols = cells(shape, order)
+                self.assertEqual(traversal_rank(shape, order, rows, cols).tolist(), list(range(shape[0] * shape[1])))
+        self.assertRaises(ValueError, traversal_rank, (3, 4), "hilbert", [0], [0])
+
+    def test2(self):
+        grid = np.random.default_rng(0).integers(-3, 20, size=(7, 9))
+        for order in ORDERS:
+            ranks, rows, cols = matches(grid, order, lambda values: values < 0)
+            self.assertEqual(ranks.tolist(), np.flatnonzero(traverse(grid, order) < 0).tolist())
+            self.assertTrue((grid[rows, cols] < 0).all())
+        letters = np.frombuffer(b"hello world!", dtype=np.uint8).reshape(3, 4)
+        self.assertEqual(matches(letters, "spiral", b"aeiou")[0].tolist(), [1, 4, 9])
+        self.assertEqual(matches([["h", "e"], ["l", "o"]], "snake", "aeiou")[0].tolist(), [1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,164 @@
+"""
+Shared NumPy engine for the matrix traversals of the sibling folders.
+
+A traversal order of an n x m grid is computed once per (shape, order) as a flat
+index array: position k of the traversal visits cell divmod(order[k], m). The
+arrays are kept in an LRU cache, so traversing a grid is a single fancy-indexing
+gather, grid.ravel()[order], with no Python loop over cells.
+
+Orders:
+- "row": row by row, left to right
+- "snake": row by row, left to right on even rows and right to left on odd ones
+  (zigzag_traversal_with_primes)
+- "spiral": clockwise spiral from the top-left cell inwards (clockwise_spiral_traversal);
+  its first boundary_length(shape, layers) cells are the outer `layers` boundary
+  layers (matrix_boundary_concatenation)
+- "diagonal": anti-diagonal zigzag from the top-left cell, going down-left on odd
+  diagonals and up-right on even ones (zigzag_traversal)
+
+The other folders import it with
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "traversal_engine"))
+"""
+from functools import lru_cache
+import numpy as np
+
+ORDERS = ("row", "snake", "spiral", "diagonal")
+
+
+def _row(n, m):
+    return np.arange(n * m)
+
+
+def _snake(n, m):
+    index = np.arange(n * m).reshape(n, m)
+    index[1::2] = index[1::2, ::-1]
+    return index.ravel()
+
+
+def _spiral_segments(n, m):
+    for k in range((min(n, m) + 1) // 2):
+        top, bottom, left, right = k, n - 1 - k, k, m - 1 - k
+        yield top * m + left, 1, right - left + 1
+        yield (top + 1) * m + right, m, bottom - top
+        if top < bottom:
+            yield bottom * m + right - 1, -1, right - left
+        if left < right:
+            yield (bottom - 1) * m + left, -m, bottom - top - 1
+
+
+def _diagonal_segments(n, m):
+    for d in range(n + m - 1):
+        low, high = max(0, d - m + 1), min(d, n - 1)
+        if d % 2 == 0:
+            yield high * (m - 1) + d, -(m - 1), high - low + 1
+        else:
+            yield low * (m - 1) + d, m - 1, high - low + 1
+
+
+def _row_segments(n, m):
+    yield 0, 1, n * m
+
+
+def _snake_segments(n, m):
+    for i in range(n):
+        yield (i * m, 1, m) if i % 2 == 0 else (i * m + m - 1, -1, m)
+
+
+_SEGMENTS = {"row": _row_segments, "snake": _snake_segments, "spiral": _spiral_segments,
+             "diagonal": _diagonal_segments}
+
+
+def segments(shape, order):
+    """Yield the traversal of a grid of shape as runs (start, step, count) of flat indices
+    start, start + step, ..., start + (count - 1) * step, without materializing it."""
+    if order not in _SEGMENTS:
+        raise ValueError(f"Unknown traversal order {order!r}, expected one of {ORDERS}")
+    n, m = shape
+    if n > 0 and m > 0:
+        for start, step, count in _SEGMENTS[order](n, m):
+            if count > 0:
+                yield start, step, count
+
+
+def _from_segments(order):
+    def build(n, m):
+        return np.concatenate([start + step * np.arange(count) for start, step, count in segments((n, m), order)])
+    return build
+
+
+_BUILDERS = {"row": _row, "snake": _snake, "spiral": _from_segments("spiral"), "diagonal": _from_segments("diagonal")}
+
+
+@lru_cache(maxsize=32)
+def traversal_order(shape, order):
+    """Read-only flat index array of the cells of a grid of shape (n, m) in the given order."""
+    if order not in _BUILDERS:
+        raise ValueError(f"Unknown traversal order {order!r}, expected one of {ORDERS}")
+    n, m = shape
+    if n <= 0 or m <= 0:
+        index = np.empty(0, dtype=np.intp)
+    else:
+        index = _BUILDERS[order](n, m).astype(np.intp, copy=False)
+    index.flags.writeable = False
+    return index
+
+
+def ring_size(shape, layer):
+    """Number of cells in boundary layer `layer` (0 is the outermost) of a grid of shape."""
+    rows, cols = shape[0] - 2 * layer, shape[1] - 2 * layer
+    if rows <= 0 or cols <= 0:
+        return 0
+    if rows == 1 or cols == 1:
+        return rows * cols
+    return 2 * (rows + cols) - 4
+
+
+def boundary_length(shape, layers):
+    """Number of cells in the outer `layers` boundary layers of a grid of shape, which is also
+    the spiral index of the first cell of layer `layers`."""
+    n, m = shape
+    if layers <= 0:
+        return 0
+    if layers >= (min(n, m) + 1) // 2:
+        return max(n, 0) * max(m, 0)
+    # Every layer but the innermost is a full ring of 2 * (n + m) - 4 - 8 * layer cells
+    return 2 * layers * (n + m - 2 * layers)
+
+
+def as_grid(grid):
+    """grid (a 2D array or list of lists) as an array. Lists of ints too large for int64 are
+    kept as Python ints (dtype object) instead of being rounded to floats."""
+    array = np.asarray(grid)
+    if array.dtype.kind == "f" and not isinstance(grid, np.ndarray) and all(
+            isinstance(value, int) for row in grid for value in row):
+        return np.array(grid, dtype=object)
+    return array
+
+
+def traverse(grid, order):
+    """The values of grid (a 2D array or list of lists) in traversal order, as a 1D array."""
+    grid = as_grid(grid)
+    return grid.reshape(-1)[traversal_order(grid.shape, order)]
+
+
+def boundary_layers(grid, layers):
+    """The values of the outer `layers` boundary layers of grid, each clockwise from its top-left cell."""
+    grid = as_grid(grid)
+    return grid.reshape(-1)[traversal_order(grid.shape, "spiral")[:boundary_length(grid.shape, layers)]]
+
+
+def cells(shape, order):
+    """(rows, cols) arrays of the cells of a grid of shape in traversal order."""
+    return np.divmod(traversal_order(tuple(shape), order), shape[1])
+
+
+if __name__ == "__main__":
+    import time
+
+    grid = np.arange(4096 * 4096, dtype=np.int32).reshape(4096, 4096)
+    for order in ORDERS:
+        start = time.perf_counter()
+        traversal_order(grid.shape, order)
+        built = time.perf_counter()
+        traverse(grid, order)
+        print(f"{order:<9} index {(built - start) * 1e3:7.1f} ms, gather {(time.perf_counter() - built) * 1e3:6.1f} ms")
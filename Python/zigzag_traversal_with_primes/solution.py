@@ -1,3 +1,12 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "traversal_engine"))
+from traversal_engine import as_grid
+from query import matches
+from primes import is_prime_array
+
+
 def is_prime(n):
     if n <= 1:
         return False
@@ -12,12 +21,8 @@ def is_prime(n):
 
 
 def zigzag_traverse_and_primes(matrix):
-    n = len(matrix)
-
-    results = []
-    for i in range(n):
-        if i % 2 == 0:
-            results.extend(matrix[i][j] for j in range(n))
-        else:
-            results.extend(matrix[i][j] for j in reversed(range(n)))
-    return {k + 1: v for k, v in enumerate(results) if is_prime(v)}
\ No newline at end of file
+    grid = as_grid(matrix)
+    # Primes classified all at once, then sorted by their position in the rows
+    # taken left to right and right to left in turn
+    positions, rows, cols = matches(grid, "snake", is_prime_array)
+    return dict(zip((positions + 1).tolist(), grid[rows, cols].tolist()))
\ No newline at end of file
@@ -1,5 +1,8 @@
 import unittest
-from solution import zigzag_traverse_and_primes
+import numpy as np
+from primes import PrimeSieve, is_prime_array
+from primes import is_prime as miller_rabin_is_prime
+from solution import is_prime, zigzag_traverse_and_primes
 
 
 class TestZigZagTraverse(unittest.TestCase):
@@ -49,6 +52,41 @@ class TestZigZagTraverse(unittest.TestCase):
         output = {1: 31, 7: 41, 9: 37, 11: 47, 13: 53, 17: 61, 19: 59, 21: 67, 23: 71, 25: 73}
         self.assertEqual(zigzag_traverse_and_primes(input_matrix), output)
 
+    def test_6(self):
+        input_matrix = [
+            [1000000007, 4, 2147483647],
+            [4294967291, 4294967297, 9],
+            [6, 18446744073709551557, 10]
+        ]
+        output = {1: 1000000007, 3: 2147483647, 6: 4294967291, 8: 18446744073709551557}
+        self.assertEqual(zigzag_traverse_and_primes(input_matrix), output)
+
+    def test_7(self):
+        self.assertEqual(zigzag_traverse_and_primes([[1, 2], [3, 100000000]]), {2: 2, 4: 3})
+        self.assertEqual(zigzag_traverse_and_primes([[5, 4294967311], [7, 9]]), {1: 5, 2: 4294967311, 4: 7})
+
+
+class TestPrimes(unittest.TestCase):
+
+    def test_1(self):
+        values = list(range(-10, 5000))
+        self.assertEqual(is_prime_array(values).tolist(), [is_prime(v) for v in values])
+
+    def test_2(self):
+        sieve = PrimeSieve(limit=100, segment_size=64)
+        sieve.grow(10 ** 5)
+        self.assertEqual(len(sieve.primes_below(10 ** 5)), 9592)
+        self.assertEqual(sieve.lookup(np.array([99991, 99993])).tolist(), [True, False])
+        for segment_size in (1, 3, 12):
+            primes = PrimeSieve(limit=16, segment_size=segment_size).primes_below(1000).tolist()
+            self.assertEqual(primes, [n for n in range(1000) if is_prime(n)])
+
+    def test_3(self):
+        values = np.array([[67108859, 67108863], [3215031751, 4294967311]])
+        self.assertEqual(is_prime_array(values).tolist(), [[True, False], [False, True]])
+        # A strong pseudoprime to the bases 2 to 37
+        self.assertFalse(miller_rabin_is_prime(318665857834031151167461))
+
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file